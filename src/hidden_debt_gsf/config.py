@@ -1,4 +1,5 @@
 """All the general configuration of the project."""
+import os
 from pathlib import Path
 
 SRC = Path(__file__).parent.resolve()
@@ -10,6 +11,9 @@ BLD_tables = BLD / "tables"
 
 TEST_DIR = SRC.joinpath("..", "..", "tests").resolve()
 
+# Worker processes for the parallel build stages (1 = sequential)
+N_WORKERS = int(os.environ.get("HIDDEN_DEBT_GSF_WORKERS", 1))
+
 __all__ = [
     "BLD",
     "SRC",
@@ -17,5 +21,6 @@ __all__ = [
     "BLD_figures",
     "BLD_tables",
     "TEST_DIR",
+    "N_WORKERS",
     "GROUPS",
 ]
\ No newline at end of file
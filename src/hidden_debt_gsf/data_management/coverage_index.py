@@ -0,0 +1,160 @@
+"""Coverage index of the WEB_CSV vintages.
+
+For every combination of flow, sector, unit, residence and instrument the index
+of a vintage holds the number of non-missing year entries of its ``Value`` rows
+and the set of countries with at least one such row, stored as a bitset indexed
+by Country Code. It is built once per vintage from the per-row entry counts of
+the Parquet cache, so summaries query a few thousand index rows instead of
+rescanning the year matrix.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from hidden_debt_gsf.config import BLD_data
+from hidden_debt_gsf.data_management.web_csv import WEB_CSV_DIR, filter_keywords, read_coverage
+
+COVERAGE_DIR = BLD_data / "Coverage"
+
+FLOW_COLUMN = 'Stocks, Transactions, and Other Flows Name'
+
+COVERAGE_KEYS = [
+    FLOW_COLUMN, 'Sector Name', 'Unit Name', 'Residence Name', 'Instrument and Assets Classification Name'
+]
+
+SUMMARY_COLUMNS = ['Sum of Legitimate Entries', 'Number of Covered Countries']
+
+
+def coverage_path(year, coverage_dir=COVERAGE_DIR):
+    """Return the path of the coverage index of a vintage."""
+    return coverage_dir / f"coverage_{year}.parquet"
+
+
+def pack_countries(group_ids, country_codes, n_groups):
+    """
+    Build one country bitset per group, with bit ``code`` set for every covered country.
+
+    Returns:
+        list: ``n_groups`` bitsets as bytes, all of the same length.
+    """
+    n_bits = int(country_codes.max()) + 1 if len(country_codes) else 0
+    covered = np.zeros((n_groups, n_bits), dtype=bool)
+    covered[group_ids, country_codes] = True
+    packed = np.packbits(covered, axis=1, bitorder="little")
+    return [row.tobytes() for row in packed]
+
+
+def unpack_countries(bitset):
+    """Return the Country Codes set in a bitset."""
+    return np.flatnonzero(np.unpackbits(np.frombuffer(bitset, dtype=np.uint8), bitorder="little"))
+
+
+def count_countries(bitsets):
+    """Return the number of countries in every bitset of a sequence."""
+    return np.array([np.unpackbits(np.frombuffer(bitset, dtype=np.uint8)).sum() for bitset in bitsets], dtype="int64")
+
+
+def index_coverage(rows):
+    """
+    Build a coverage index from ``Value`` rows with their entry counts.
+
+    Args:
+        rows (pd.DataFrame): 'Country Code', COVERAGE_KEYS and 'Entry Count' of the
+            ``Value`` rows, as returned by ``read_coverage``.
+
+    Returns:
+        pd.DataFrame: One row per combination of COVERAGE_KEYS, sorted by them, with
+        'Entries' (non-missing year entries), 'Countries' (bitset of the covered
+        Country Codes) and 'Number of Countries'. Rows with a missing key belong to
+        no combination, as in groupby.
+    """
+    rows = rows.dropna(subset=COVERAGE_KEYS)
+
+    grouped = rows.groupby(COVERAGE_KEYS, observed=True)
+    group_ids = grouped.ngroup().to_numpy(dtype=np.int64)
+    index = grouped.size().index.to_frame(index=False)
+
+    entries = np.bincount(group_ids, weights=rows["Entry Count"].to_numpy(), minlength=len(index))
+    index["Entries"] = entries.astype("int64")
+
+    has_country = rows["Country Code"].notna().to_numpy()
+    index["Countries"] = pack_countries(
+        group_ids[has_country], rows["Country Code"].to_numpy()[has_country].astype("int64"), len(index)
+    )
+    index["Number of Countries"] = count_countries(index["Countries"])
+    return index
+
+
+def build_coverage_index(year, data_dir=WEB_CSV_DIR):
+    """
+    Build the coverage index of one vintage (see ``index_coverage``).
+
+    Args:
+        year (int or str): Vintage to index.
+        data_dir (Path): Directory holding the raw ``GFSIBS{year}.csv`` files.
+    """
+    return index_coverage(read_coverage(year, columns=['Country Code', *COVERAGE_KEYS], data_dir=data_dir))
+
+
+def write_coverage_index(index, output_path):
+    """Write a coverage index as Parquet."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(index, preserve_index=False), output_path)
+    print(f"Indexed {len(index)} combinations in {output_path}")
+
+
+def read_coverage_index(year, coverage_dir=COVERAGE_DIR):
+    """Load the coverage index of a vintage."""
+    return pd.read_parquet(coverage_path(year, coverage_dir))
+
+
+def summarize_coverage(index, keywords):
+    """
+    Summarize the combinations whose flow name contains any of the keywords.
+
+    Same result as grouping the ``Value`` rows selected by
+    ``filter_keywords(..., label="Keyword")`` by COVERAGE_KEYS and counting their
+    year entries and distinct countries: a combination matching several keywords is
+    selected once per keyword, so its entries count once per keyword as well.
+
+    Args:
+        index (pd.DataFrame): Coverage index of one vintage.
+        keywords (list): Keywords matched against the flow name (case-insensitive).
+
+    Returns:
+        pd.DataFrame: COVERAGE_KEYS with 'Sum of Legitimate Entries' and
+        'Number of Covered Countries', in the order of the index.
+    """
+    matches = filter_keywords(index, FLOW_COLUMN, keywords, label="Keyword").index.value_counts()
+    selected = index[index.index.isin(matches.index)]
+    summary = selected[COVERAGE_KEYS].assign(**{
+        'Sum of Legitimate Entries': selected["Entries"] * matches.reindex(selected.index),
+        'Number of Covered Countries': selected["Number of Countries"],
+    })
+    return summary.reset_index(drop=True)
+
+
+def fold_coverage_summary(aggregate, summary):
+    """
+    Fold the summary of one vintage into the running aggregate over vintages.
+
+    Entries are summed and the number of covered countries is the maximum over the
+    vintages, so the vintages can be reduced one at a time without keeping them.
+
+    Args:
+        aggregate (pd.DataFrame or None): Aggregate so far, indexed by COVERAGE_KEYS
+            as text; None before the first vintage.
+        summary (pd.DataFrame): Summary of one vintage as returned by ``summarize_coverage``.
+
+    Returns:
+        pd.DataFrame: The updated aggregate, indexed by COVERAGE_KEYS.
+    """
+    summary = summary.astype({col: str for col in COVERAGE_KEYS}).set_index(COVERAGE_KEYS)[SUMMARY_COLUMNS]
+    if aggregate is None:
+        return summary
+    aggregate, summary = aggregate.align(summary, join="outer")
+    return pd.DataFrame({
+        'Sum of Legitimate Entries': aggregate['Sum of Legitimate Entries'].add(summary['Sum of Legitimate Entries'], fill_value=0),
+        'Number of Covered Countries': np.fmax(aggregate['Number of Covered Countries'], summary['Number of Covered Countries']),
+    }).astype("int64")
@@ -0,0 +1,667 @@
+"""Indicator-spec-driven merge of the CDROM DTA and WEB_CSV vintages.
+
+Every GFS indicator is described by a spec holding its WEB_CSV flow code, the
+TimeSeriesKey suffixes of its debt types in the CDROM files, its descriptor and
+its output paths. All specs are extracted in one shared scan over the sources,
+so adding an indicator costs no extra parsing passes.
+
+Rebuilds are incremental: the processed rows of every vintage are persisted in
+VINTAGE_CACHE_DIR together with the SHA-256 of their source file and of the
+filter spec, and only vintages whose hashes changed are processed again. The
+vintage differences are then recomputed only for the (indicator, debt type,
+country) groups that hold rows of those vintages.
+"""
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+from hidden_debt_gsf.config import SRC, BLD_data
+from hidden_debt_gsf.data_management.web_csv import (
+    HASH_KEY,
+    concat_categorical,
+    csv_path,
+    file_hash,
+    read_gfsibs_sparse,
+)
+from hidden_debt_gsf.data_management.timeseries_keys import decode_keys, extend_key_table, label_keys, lookup_keys
+from hidden_debt_gsf.data_management.wide_to_long import entries_to_long, wide_to_long
+
+DATA_PATH = SRC / "data"
+VINTAGE_CACHE_DIR = BLD_data / "Merged" / "vintages"
+
+# Bump to invalidate the persisted vintages when the extraction logic changes
+CACHE_VERSION = 4
+SPEC_KEY = b"spec_sha256"
+
+DTA_YEARS = ['2004', '2005', '2006', '2007', '2008', '2009', '2010', '2012', '2013']
+CSV_YEARS = ['2014', '2015', '2016', '2017', '2019', '2020', '2024']
+
+DEBT_TYPES = ["total", "domestic", "foreign"]
+
+RESIDENCE_CODES = {
+    "total": "W0|S1",
+    "domestic": "W2|S1",
+    "foreign": "W1|S1"
+}
+
+INDICATORS = {
+    "debt_stock": {
+        "flow_code": "G63",
+        "dta_suffixes": {
+            "total": "GG_63",
+            "domestic": "GG_631",
+            "foreign": "GG_632"
+        },
+        "descriptor": "Stock position liabilities",
+        "produces": {
+            'dta': BLD_data / "Merged" / "all_types_debt_stock.dta",
+            'csv': BLD_data / "Merged" / "all_types_debt_stock.csv"
+        },
+    },
+    "net_incurrence": {
+        "flow_code": "G33",
+        "dta_suffixes": {
+            "total": "GG_33",
+            "domestic": "GG_331",
+            "foreign": "GG_332"
+        },
+        "descriptor": "Net incurrence of liabilities",
+        "produces": {
+            'dta': BLD_data / "Merged" / "all_types_net_incurrence_liabilities.dta",
+            'csv': BLD_data / "Merged" / "all_types_net_incurrenence_liabilities.csv"
+        },
+    },
+}
+
+# Columns of the CDROM files that process_dta_data uses
+DTA_COLUMNS = ['TimeSeriesKey', 'CTRY_CODE', 'OStartYY', 'OValue17', 'Rep_Basis', 'S_Desc', 'CTRY_NAME']
+
+# Rows per chunk when streaming a CDROM file
+DTA_CHUNK_SIZE = 100_000
+
+CSV_COLUMNS = [
+    'Country Code', 'Country Name', 'Sector Name', 'Attribute', 'Unit Code', 'Residence Code',
+    'Instrument and Assets Classification Code', 'Stocks, Transactions, and Other Flows Code', 'Sector Code'
+]
+
+# Compact dtypes of the long-format panel, applied as soon as a vintage is extracted
+PANEL_SCHEMA = {
+    'Country Code': 'int16',
+    'Year': 'int16',
+    'Vintage': 'int16',
+    'Value': 'float64',
+    'Value_Diff': 'float64',
+    'Value_Diff_Perc': 'float64',
+    'Country Name': 'category',
+    'CTRY_NAME': 'category',
+    'Rep_Basis': 'category',
+    'Sector Name': 'category',
+    'Descriptor': 'category',
+    'Indicator': 'category',
+    'Residence Name': 'category',
+}
+
+# Labels stored as stripped text, with missing values as 'nan'
+TEXT_LABELS = ['Rep_Basis', 'Sector Name']
+
+OUTPUT_COLUMNS = [
+    'Country Code', 'Country Name', 'Year', 'Vintage', 'Rep_Basis', 'Value', 'Sector Name',
+    'Descriptor', 'Residence Name', 'Value_Diff', 'Value_Diff_Perc'
+]
+
+
+def check_debt_types(debt_types):
+    if not set(debt_types) <= set(RESIDENCE_CODES):
+        raise ValueError("Invalid debt_type. Choose from 'total', 'domestic', or 'foreign'.")
+
+
+def as_text_labels(values, strip=False):
+    """
+    Categorical equivalent of ``values.astype(str)``, optionally followed by ``.str.strip()``.
+
+    Only the distinct labels are converted, and the result has sorted categories.
+    """
+    values = values.astype("category")
+    labels = values.cat.categories.astype(str)
+    if strip:
+        labels = labels.str.strip()
+    # Missing values take the code of 'nan', the last entry before sorting
+    labels, inverse = np.unique(np.append(labels.to_numpy(dtype=object), "nan"), return_inverse=True)
+    codes = inverse[values.cat.codes.to_numpy()]
+    text = pd.Categorical.from_codes(codes, categories=labels).remove_unused_categories()
+    return pd.Series(text, index=values.index, name=values.name)
+
+
+def apply_panel_schema(df):
+    """Cast the columns of a long-format panel to PANEL_SCHEMA and normalize its text labels."""
+    df = df.astype({col: dtype for col, dtype in PANEL_SCHEMA.items() if col in df.columns})
+    for col in TEXT_LABELS:
+        if col in df.columns:
+            df[col] = as_text_labels(df[col], strip=True)
+    return df
+
+
+def dta_path(data_path, year):
+    """Return the path of the CDROM DTA file for a vintage."""
+    return data_path / "CD_DTA" / f"gfs_{year}_CDROM.dta"
+
+
+def dta_suffix_map(specs=INDICATORS, debt_types=DEBT_TYPES):
+    """Map the TimeSeriesKey suffixes of all indicators and debt types to (indicator, debt type)."""
+    check_debt_types(debt_types)
+    return {
+        spec["dta_suffixes"][dt]: (name, dt)
+        for name, spec in specs.items() for dt in debt_types
+    }
+
+
+def read_dta(data_path, year, suffix_to_key=None, key_table=None, chunksize=DTA_CHUNK_SIZE):
+    """
+    Read the DTA_COLUMNS of a CDROM vintage in chunks.
+
+    Only the columns in DTA_COLUMNS that exist in the file are converted. The distinct
+    TimeSeriesKeys of every chunk are decoded once into the key table, and with
+    ``suffix_to_key`` each chunk is reduced to the rows of the requested series before
+    the next one is read, so the full file is never held in memory.
+
+    Args:
+        data_path (Path): Folder holding the CD_DTA directory.
+        year (str): Vintage to read.
+        suffix_to_key (dict, optional): Requested suffixes as returned by dta_suffix_map.
+            Keeps all rows if None.
+        key_table (pd.DataFrame, optional): Decoded keys of the whole file, e.g. from the
+            cache. Decoded while reading if None.
+        chunksize (int): Rows per chunk.
+
+    Returns:
+        tuple: (kept rows, decoded key table of the whole file).
+    """
+    file = dta_path(data_path, year)
+    with pd.read_stata(file, iterator=True) as reader:
+        available = reader.variable_labels()
+    columns = [col for col in DTA_COLUMNS if col in available]
+
+    decode = key_table is None
+    wanted = None
+    chunks = []
+    with pd.read_stata(file, columns=columns, chunksize=chunksize) as reader:
+        for chunk in reader:
+            keys = chunk['TimeSeriesKey'].astype(str)
+            if decode:
+                extended = extend_key_table(key_table, keys)
+                if extended is not key_table:
+                    key_table, wanted = extended, None
+            if suffix_to_key is not None:
+                if wanted is None:
+                    wanted = label_keys(key_table, suffix_to_key)['TimeSeriesKey']
+                chunk = chunk[keys.isin(wanted)]
+            chunks.append(chunk)
+    if key_table is None:
+        key_table = decode_keys([])
+    return concat_categorical(chunks), key_table
+
+
+def process_dta_data(df_dta, year, specs=INDICATORS, debt_types=DEBT_TYPES, key_table=None):
+    """
+    Extract the rows of all indicators and debt types from one CDROM vintage.
+
+    Each TimeSeriesKey is routed to its (indicator, debt type) by the sector and item
+    of its decoded key. The labels are kept in 'Indicator' and 'Residence Name'. Pass
+    the ``key_table`` of the file to skip decoding the keys again.
+    """
+    suffix_to_key = dta_suffix_map(specs, debt_types)
+    if key_table is None:
+        key_table = decode_keys(df_dta['TimeSeriesKey'])
+    labelled = label_keys(key_table, suffix_to_key)
+
+    position = lookup_keys(df_dta['TimeSeriesKey'].astype(str), labelled)
+    matched = position >= 0
+    filtered_df = df_dta[matched].copy()
+    fields = labelled.iloc[position[matched]]
+    filtered_df['Indicator'] = fields['Indicator'].to_numpy()
+    filtered_df['Residence Name'] = fields['Residence Name'].to_numpy()
+    filtered_df['Vintage'] = int(year)
+    filtered_df['Country Code'] = filtered_df['CTRY_CODE']
+    filtered_df['Year'] = filtered_df['OStartYY']
+    filtered_df['Value'] = filtered_df['OValue17']
+    filtered_df['Rep_Basis'] = filtered_df.get('Rep_Basis', '')
+    filtered_df['Sector Name'] = filtered_df.get('S_Desc', '')
+    basis = pd.DataFrame(
+        {'Basis': fields['Basis'].to_numpy(), 'Variant': fields['Variant'].to_numpy()}, index=filtered_df.index
+    )
+
+    # Drop rows where 'Value' is nan
+    has_value = filtered_df['Value'].notna().to_numpy()
+    filtered_df, basis = filtered_df[has_value], basis[has_value]
+
+    # Drop the Z basis variants ('_aZ_' or '_cZ_' keys)
+    not_z = (basis['Variant'] != 'Z').to_numpy()
+    filtered_df, basis = filtered_df[not_z], basis[not_z]
+
+    # Resolve duplicate entries by basis priority: where an entry has a B variant ('_aB_' or
+    # '_cB_'), only B variants are eligible. Of the eligible rows the first per accrual/cash
+    # basis in file order is kept. Group ids, a per-group minimum and a hashed dedupe keep
+    # this linear in the number of rows.
+    keys = ['Indicator', 'Residence Name', 'Year', 'Country Code', 'Vintage']
+    priority = np.where(basis['Variant'] == 'B', 0, 1).astype(np.int8)
+    group = filtered_df.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+    best = np.ones(group.max() + 1 if len(group) else 0, dtype=np.int8)
+    np.minimum.at(best, group, priority)
+    keep = priority == best[group]
+    ranked = filtered_df[keys].assign(Basis=basis['Basis'].to_numpy())
+    keep[keep] = ~ranked[keep].duplicated().to_numpy()
+    final_df = filtered_df[keep]
+
+    n_conflicts = len(np.unique(group[~keep]))
+    if n_conflicts:
+        print(f"Resolved {n_conflicts} duplicate entries in the {year} vintage ({(~keep).sum()} rows dropped)")
+
+    # Select required columns
+    cols_to_keep = ['Country Code', 'Year', 'Vintage', 'Rep_Basis', 'Value', 'Sector Name', 'CTRY_NAME', 'Indicator', 'Residence Name']
+    return apply_panel_schema(final_df[cols_to_keep])
+
+
+def process_csv_data(df_csv, year, specs=INDICATORS, debt_types=DEBT_TYPES, start_year=1970, end_year=2025,
+                     entries=None):
+    """
+    Extract the rows of all indicators and debt types from one WEB_CSV vintage.
+
+    Rows are labelled with their indicator (by flow code) and debt type (by residence code).
+    With ``entries`` the values are taken from the sparse (Row, Year, Value) entries of
+    ``read_gfsibs_sparse`` instead of the year columns of the ``Value`` rows.
+    """
+    check_debt_types(debt_types)
+    residence_codes = [RESIDENCE_CODES[dt] for dt in debt_types]
+    flow_to_indicator = {spec["flow_code"]: name for name, spec in specs.items()}
+
+    filtered_df = df_csv[
+        (df_csv['Unit Code'] == 'XDC') &
+        (df_csv['Residence Code'].isin(residence_codes)) &
+        (df_csv['Instrument and Assets Classification Code'] == 'F') &
+        (df_csv['Stocks, Transactions, and Other Flows Code'].isin(list(flow_to_indicator))) &
+        (df_csv['Sector Code'] == 'S13')
+    ].copy()
+    # The cached vintages carry categorical text columns; plain strings keep the fillna below valid
+    filtered_df = filtered_df.astype({col: object for col in filtered_df.select_dtypes('category').columns})
+
+    sector_data = filtered_df.sort_values(by='Country Code').copy()
+    sector_data['Vintage'] = int(year)
+    # Label each row with its indicator and debt type
+    code_to_type = {code: dt for dt, code in RESIDENCE_CODES.items()}
+    sector_data['Indicator'] = sector_data['Stocks, Transactions, and Other Flows Code'].map(flow_to_indicator)
+    sector_data['Residence Name'] = sector_data['Residence Code'].map(code_to_type)
+
+    year_columns = [col for col in sector_data.columns
+                    if col.isdigit() and start_year <= int(col) <= end_year]
+
+    main_df = sector_data[sector_data["Attribute"] == "Value"]
+    additional_info_df = sector_data[sector_data["Attribute"] == "Bases of recording (Cash/ Non Cash)"]
+
+    id_vars = [c for c in sector_data.columns if c not in year_columns]
+    if entries is not None:
+        df_long = entries_to_long(main_df, id_vars, entries, years=(start_year, end_year))
+    else:
+        df_long = wide_to_long(main_df, id_vars, year_columns=year_columns, var_name="Year", value_name="Value")
+
+    # Missing flags only drop rows the left merge below fills with "" anyway
+    additional_long = wide_to_long(
+        additional_info_df,
+        id_vars=['Country Code', 'Indicator', 'Residence Name'],
+        year_columns=year_columns,
+        var_name="Year",
+        value_name="Cash_Accrual",
+        dtype=None
+    )
+
+    final_df = pd.merge(
+        df_long, additional_long, on=['Country Code', 'Indicator', 'Residence Name', 'Year'], how="left"
+    ).fillna("")
+    final_df.loc[final_df['Cash_Accrual'] == 'AC', 'Rep_Basis'] = 'Accrual'
+    final_df.loc[final_df['Cash_Accrual'] == 'CA', 'Rep_Basis'] = 'Cash Basis'
+
+    if 'Sector Name' not in final_df.columns:
+        final_df['Sector Name'] = ''
+
+    cols_to_keep = ['Country Code', 'Country Name', 'Year', 'Vintage', 'Rep_Basis', 'Value', 'Sector Name', 'Indicator', 'Residence Name']
+    final_df['Vintage'] = int(year)
+    for col in cols_to_keep:
+        if col not in final_df.columns:
+            final_df[col] = ''
+    return apply_panel_schema(final_df[cols_to_keep])
+
+
+def fill_missing_values(df, specs=INDICATORS):
+    """
+    Fill missing values in 'Country Name' by first forward/backward filling within each
+    indicator, debt type and Country Code group, and then assigning the value from 'CTRY_NAME'
+    if still missing. Finally, drop 'CTRY_NAME' and add the indicator's descriptor.
+    """
+    # Define columns to fill
+    columns_to_fill = ["Country Name"]
+
+    # Sort by Country Code for consistency
+    df = df.sort_values(by=["Country Code"]).copy()
+
+    # Group by indicator, debt type and 'Country Code' and fill missing values using ffill and bfill
+    keys = [df["Indicator"], df["Residence Name"], df["Country Code"]]
+    for col in columns_to_fill:
+        df[col] = df[col].groupby(keys, observed=True).ffill().groupby(keys, observed=True).bfill()
+
+    # For any remaining NaN in 'Country Name', assign the value from 'CTRY_NAME'
+    names = union_categoricals([df["Country Name"], df["CTRY_NAME"]], ignore_order=True).categories
+    df["Country Name"] = df["Country Name"].cat.set_categories(names).fillna(df["CTRY_NAME"].cat.set_categories(names))
+
+    # Drop 'CTRY_NAME' as it is no longer needed
+    df = df.drop(columns=["CTRY_NAME"])
+
+    # Add additional columns
+    df['Descriptor'] = df['Indicator'].map({name: spec["descriptor"] for name, spec in specs.items()}).astype("category")
+
+    return df
+
+
+def filter_majority_basis(df):
+    """
+    For each indicator, debt type and country, keep only the reporting basis (Rep_Basis)
+    that appears most frequently.
+    """
+    keys = ['Indicator', 'Residence Name', 'Country Code']
+    counts = df.groupby(keys + ['Rep_Basis'], observed=True).size().reset_index(name='count')
+    chosen = counts.loc[counts.groupby(keys, observed=True)['count'].idxmax(), keys + ['Rep_Basis']]
+    filtered_df = pd.merge(df, chosen, on=keys + ['Rep_Basis'], how='inner')
+    return filtered_df
+
+
+def calculate_vintage_diff(df):
+    """
+    For each indicator, debt type, Country Code and Year, calculate the difference in Value
+    between each vintage (ordered by the Vintage year) and its immediately preceding vintage.
+    """
+    # Ensure that Value and Vintage are numeric
+    df["Value"] = pd.to_numeric(df["Value"], errors='coerce')
+    df["Vintage"] = pd.to_numeric(df["Vintage"], errors='coerce')
+
+    # Sort by Country Code, Year, and Vintage to ensure correct ordering
+    df = df.sort_values(by=["Country Code", "Year", "Vintage"])
+
+    # Compute the difference in Value with respect to the previous vintage within each group
+    grouped = df.groupby(["Indicator", "Residence Name", "Country Code", "Year"], observed=True)["Value"]
+    df["Value_Diff"] = grouped.diff()
+    # Calculate percentage change using the previous vintage's Value
+    df["Value_Diff_Perc"] = df["Value_Diff"] / grouped.shift(1) * 100
+
+    return df
+
+
+def load_dta_vintage(data_path, year, specs=INDICATORS, debt_types=DEBT_TYPES, cache_dir=None):
+    """
+    Read and process one CDROM DTA vintage, streaming it through the suffix filter.
+
+    With ``cache_dir`` set, the decoded TimeSeriesKeys of the file are kept there next to
+    the processed vintages and reused while the file is unchanged.
+    """
+    suffix_to_key = dta_suffix_map(specs, debt_types)
+    if cache_dir is None:
+        df_dta, key_table = read_dta(data_path, year, suffix_to_key)
+        return process_dta_data(df_dta, year, specs, debt_types, key_table)
+
+    key_path = cache_dir / f"dta_{year}_keys.parquet"
+    hashes = {HASH_KEY: file_hash(dta_path(data_path, year)).encode()}
+    cached_keys = pd.read_parquet(key_path) if has_hashes(key_path, hashes) else None
+    df_dta, key_table = read_dta(data_path, year, suffix_to_key, cached_keys)
+    if cached_keys is None:
+        write_with_hashes(key_table, key_path, hashes)
+    return process_dta_data(df_dta, year, specs, debt_types, key_table)
+
+
+def load_csv_vintage(data_path, year, specs=INDICATORS, debt_types=DEBT_TYPES):
+    """Read and process one WEB_CSV vintage."""
+    folder = "WEB_CSV"
+    # Read only the columns process_csv_data filters and keeps, and the values as sparse entries
+    df_csv, entries, _ = read_gfsibs_sparse(year, columns=CSV_COLUMNS, data_dir=data_path / folder)
+    return process_csv_data(df_csv, year, specs, debt_types, entries=entries)
+
+
+def spec_hash(specs=INDICATORS, debt_types=DEBT_TYPES):
+    """Return the SHA-256 of everything besides the source files that shapes a processed vintage."""
+    spec = {
+        "version": CACHE_VERSION,
+        "debt_types": list(debt_types),
+        "residence_codes": RESIDENCE_CODES,
+        "csv_columns": CSV_COLUMNS,
+        "indicators": {
+            name: {key: value for key, value in indicator.items() if key != "produces"}
+            for name, indicator in specs.items()
+        },
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def has_hashes(path, hashes):
+    """Check whether a Parquet file exists and carries the given hashes in its metadata."""
+    if not path.exists():
+        return False
+    metadata = pq.read_schema(path).metadata or {}
+    return all(metadata.get(key) == value for key, value in hashes.items())
+
+
+def write_with_hashes(df, path, hashes):
+    """Write a DataFrame to Parquet with the given hashes stored in its metadata."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **hashes})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, path)
+
+
+def vintage_source(kind, data_path, year):
+    """Return the source file of a DTA or CSV vintage."""
+    if kind == "DTA":
+        return dta_path(data_path, year)
+    return csv_path(year, data_path / "WEB_CSV")
+
+
+def load_vintage(kind, data_path, year, specs=INDICATORS, debt_types=DEBT_TYPES, cache_dir=None):
+    """
+    Process one vintage, reusing its persisted result while neither its source file
+    nor the filter spec changed.
+
+    Args:
+        kind (str): 'DTA' or 'CSV'.
+        cache_dir (Path, optional): Folder of the persisted vintages. None disables the cache.
+
+    Returns:
+        tuple: (processed DataFrame, whether the vintage was processed again).
+    """
+    load = partial(load_dta_vintage, cache_dir=cache_dir) if kind == "DTA" else load_csv_vintage
+    if cache_dir is None:
+        return load(data_path, year, specs, debt_types), True
+
+    hashes = {
+        HASH_KEY: file_hash(vintage_source(kind, data_path, year)).encode(),
+        SPEC_KEY: spec_hash(specs, debt_types).encode(),
+    }
+    path = cache_dir / f"{kind.lower()}_{year}.parquet"
+    if has_hashes(path, hashes):
+        return pd.read_parquet(path), False
+
+    processed = load(data_path, year, specs, debt_types)
+    write_with_hashes(processed, path, hashes)
+    return processed, True
+
+
+def process_vintages(data_path, dta_years, csv_years, specs=INDICATORS, debt_types=DEBT_TYPES, n_workers=1,
+                     cache_dir=None):
+    """
+    Process all DTA and CSV vintages, optionally on a process pool.
+
+    Vintages are independent until they are combined, so with ``n_workers > 1`` each one
+    is processed in its own worker process. Results are returned in the order of
+    ``dta_years`` followed by ``csv_years`` regardless of completion order, and a failing
+    vintage is reported and skipped as in the sequential mode. With ``cache_dir`` set,
+    unchanged vintages are read from their persisted results instead.
+
+    Returns:
+        tuple: (list of the processed DataFrames of the vintages that succeeded,
+        list of the (kind, year) vintages that were processed again).
+    """
+    jobs = [("DTA", year) for year in dta_years] + [("CSV", year) for year in csv_years]
+
+    def collect(kind, year, get_result):
+        try:
+            return get_result()
+        except Exception as e:
+            print(f"Error processing {kind} for year {year}: {e}")
+            return None
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(load_vintage, kind, data_path, year, specs, debt_types, cache_dir)
+                for kind, year in jobs
+            ]
+            results = [
+                collect(kind, year, future.result)
+                for (kind, year), future in zip(jobs, futures)
+            ]
+    else:
+        results = [
+            collect(kind, year, lambda: load_vintage(kind, data_path, year, specs, debt_types, cache_dir))
+            for kind, year in jobs
+        ]
+
+    processed_list = [result[0] for result in results if result is not None]
+    reprocessed = [job for job, result in zip(jobs, results) if result is not None and result[1]]
+    return processed_list, reprocessed
+
+
+def update_vintage_diff(df, panel_path, hashes, changed_vintages):
+    """
+    Calculate the vintage differences, reusing those of the previously merged panel.
+
+    Only the changed vintages can alter the panel: reprocessed vintages and vintages
+    added to or removed from the panel since the previous build. The majority basis and
+    the filled country names are chosen per indicator, debt type and Country Code, so
+    every such group with a row of a changed vintage, in this panel or the previous one,
+    is recalculated. All other groups keep their rows and differences from the previous
+    panel. The result is stored as the panel of the next build.
+
+    Args:
+        df (pd.DataFrame): The combined panel without differences.
+        panel_path (Path): Parquet file of the previously merged panel.
+        hashes (dict): Metadata the previous panel must carry to be reused.
+        changed_vintages (list): Vintages that were processed again in this build.
+
+    Returns:
+        pd.DataFrame: ``df`` with 'Value_Diff' and 'Value_Diff_Perc'.
+    """
+    if not has_hashes(panel_path, hashes):
+        result = calculate_vintage_diff(df)
+    else:
+        previous = pd.read_parquet(panel_path)
+        group_keys = ["Indicator", "Residence Name", "Country Code"]
+
+        # Vintages present in only one of the two panels changed as well
+        vintages, previous_vintages = set(df["Vintage"].unique()), set(previous["Vintage"].unique())
+        changed = {int(vintage) for vintage in set(changed_vintages) | (vintages ^ previous_vintages)}
+
+        affected = pd.MultiIndex.from_frame(concat_categorical([
+            df.loc[df["Vintage"].isin(changed), group_keys],
+            previous.loc[previous["Vintage"].isin(changed), group_keys],
+        ]).drop_duplicates())
+        print(f"Recalculating vintage differences for {len(affected)} groups touched by vintages {sorted(changed)}")
+
+        is_affected = pd.MultiIndex.from_frame(df[group_keys]).isin(affected)
+        was_affected = pd.MultiIndex.from_frame(previous[group_keys]).isin(affected)
+        result = concat_categorical(
+            [calculate_vintage_diff(df[is_affected].copy()), apply_panel_schema(previous[~was_affected])]
+        ).sort_values(by=["Country Code", "Year", "Vintage"], kind="stable")
+
+    write_with_hashes(result, panel_path, hashes)
+    return result
+
+
+def main_pipeline_filtered(data_path, dta_years, csv_years, specs=INDICATORS, debt_types=DEBT_TYPES, n_workers=1,
+                           cache_dir=None):
+    """
+    Read every DTA and CSV vintage once and extract all indicators and debt types in a single
+    shared scan. With ``n_workers > 1`` the vintages are processed on a process pool. With
+    ``cache_dir`` set, the rebuild is incremental: only changed or new vintages are processed
+    and only the affected groups get their vintage differences recalculated.
+
+    Returns:
+        dict: Indicator name -> merged long-format DataFrame with the columns in OUTPUT_COLUMNS.
+    """
+    processed_list, reprocessed = process_vintages(
+        data_path, dta_years, csv_years, specs, debt_types, n_workers, cache_dir
+    )
+    if cache_dir is not None:
+        print(f"Processed {len(reprocessed)} changed or new vintages: {reprocessed}")
+
+    # Combine all processed data, with the required columns present in every vintage
+    cols_to_keep = ['Country Code', 'Country Name', 'Year', 'Vintage', 'Rep_Basis', 'Value', 'Sector Name', 'CTRY_NAME', 'Indicator', 'Residence Name']
+    combined_df = concat_categorical([processed.reindex(columns=cols_to_keep) for processed in processed_list])
+
+    # Unify the data types and text labels across the vintages
+    combined_df = apply_panel_schema(combined_df)
+
+    # Filter out majority basis
+    combined_df = filter_majority_basis(combined_df)
+
+    # Apply fill_missing_values to fill missing 'Country Name'
+    combined_df = fill_missing_values(combined_df, specs)
+
+    if cache_dir is None:
+        combined_df = calculate_vintage_diff(combined_df)
+    else:
+        panel_hashes = {SPEC_KEY: spec_hash(specs, debt_types).encode()}
+        changed_vintages = [year for _, year in reprocessed]
+        combined_df = update_vintage_diff(combined_df, cache_dir / "panel.parquet", panel_hashes, changed_vintages)
+
+    # Split per indicator, keeping the debt types in the requested order
+    type_order = {dt: i for i, dt in enumerate(debt_types)}
+    combined_df = apply_panel_schema(combined_df)
+    print(f"Merged panel: {len(combined_df)} rows, {combined_df.memory_usage(deep=True).sum() / 2**20:.1f} MB in memory")
+    combined_df = combined_df.sort_values(by="Residence Name", key=lambda s: s.map(type_order).astype(int), kind="stable")
+    return {
+        name: combined_df.loc[combined_df['Indicator'] == name, OUTPUT_COLUMNS].reset_index(drop=True)
+        for name in specs
+    }
+
+
+def clean_and_save_to_stata(df, output_path):
+    """
+    Cleans the given DataFrame to ensure compatibility with Stata and saves it as a .dta file.
+
+    Parameters:
+        df (pd.DataFrame): The DataFrame to be cleaned and saved.
+        output_path (str): The file path where the Stata file (.dta) should be saved.
+    """
+    # Replace infinite values with NaN
+    df.replace([float('inf'), float('-inf')], pd.NA, inplace=True)
+
+    # Convert object columns to string and fill None/NA with empty strings
+    for col in df.select_dtypes(include=['object']).columns:
+        df[col] = df[col].astype(str).fillna("")
+    # Categorical text columns get the same labels from their distinct values only
+    for col in df.select_dtypes(include=['category']).columns:
+        df[col] = as_text_labels(df[col])
+
+    # Convert categorical-like columns to category type (optimization for Stata)
+    categorical_columns = ["Country Name", "Rep_Basis", "Sector Name", "Descriptor", "Residence Name"]
+    for col in categorical_columns:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    # Store the compact integer columns as Stata long (int32), the width they had before PANEL_SCHEMA
+    int_columns = [col for col, dtype in PANEL_SCHEMA.items() if dtype == 'int16' and col in df.columns]
+    df[int_columns] = df[int_columns].astype('int32')
+
+    # Save the cleaned DataFrame to a Stata (.dta) file
+    df.to_stata(output_path, write_index=False)
+    print(f"Saved cleaned dataset to {output_path}")
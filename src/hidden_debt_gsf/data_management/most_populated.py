@@ -0,0 +1,45 @@
+"""Selection of each country's most populated data combination."""
+import pandas as pd
+
+
+def select_most_populated(df, combination_cols, year_columns, country_order=None):
+    """
+    Keep, for every country, only the rows of its most populated combination.
+
+    The non-null year entries are counted once per row, summed per
+    (Country Code, *combination_cols) in a single groupby, and the combination with
+    the most entries is picked per country with idxmax. The former per-country
+    ``sort_values(ascending=False)`` used an unstable sort, so for the few countries
+    with tied counts that sort is replayed on their small count table to keep the
+    same choice.
+
+    Args:
+        df (pd.DataFrame): Wide data with one column per year.
+        combination_cols (list): Columns defining a combination, e.g. ['Sector Code'].
+        year_columns (list): Year columns whose non-null entries are counted.
+        country_order (array-like, optional): Order of the countries in the output.
+            Defaults to the order of first appearance in ``df``.
+
+    Returns:
+        pd.DataFrame: The selected rows, grouped by country in ``country_order`` and in
+        their original order within a country, with a fresh RangeIndex.
+    """
+    keys = ['Country Code', *combination_cols]
+    if country_order is None:
+        country_order = df['Country Code'].unique()
+
+    entry_counts = df[year_columns].notna().sum(axis=1).groupby([df[col] for col in keys]).sum()
+    if entry_counts.empty:
+        return df.iloc[:0].reset_index(drop=True)
+    best = entry_counts.groupby(level='Country Code').idxmax()
+
+    is_max = entry_counts == entry_counts.groupby(level='Country Code').transform('max')
+    n_max = is_max.groupby(level='Country Code').sum()
+    for country in n_max.index[n_max > 1]:
+        country_counts = entry_counts.xs(country, level='Country Code', drop_level=False)
+        ranked = country_counts.reset_index(name='Data Entry Count').sort_values(by='Data Entry Count', ascending=False)
+        best[country] = tuple(ranked.iloc[0][keys])
+
+    selected = df[pd.MultiIndex.from_frame(df[keys]).isin(best.tolist())]
+    country_rank = pd.Categorical(selected['Country Code'], categories=country_order).codes
+    return selected.iloc[country_rank.argsort(kind='stable')].reset_index(drop=True)
@@ -0,0 +1,138 @@
+"""Shared steps of the outlier stage on the merged vintage panels."""
+import numpy as np
+import pandas as pd
+
+GROUP_COLUMNS = ["Country Code", "Year", "Residence Name"]
+
+
+def drop_initial_zero_entries(df, group_cols=GROUP_COLUMNS, value_col="Value"):
+    """
+    Drop the first row of a group when its value is 0.0 and the next row's value is not.
+
+    Equivalent to ``df.groupby(group_cols, group_keys=False).apply(...)`` with a function
+    returning ``group.iloc[1:]`` in that case and the whole group otherwise, but computed
+    with one mask from the position in the group, the next value and the group size.
+    As with that apply, rows with a missing group key are dropped, and the result is in
+    group order if any row is dropped and in the order of ``df`` otherwise.
+
+    Args:
+        df (pd.DataFrame): Panel sorted so that the vintages of a group are in order.
+        group_cols (list): Columns identifying a group.
+        value_col (str): Column holding the values.
+
+    Returns:
+        pd.DataFrame: ``df`` without the initial zero entries, with its index kept.
+    """
+    df = df.dropna(subset=group_cols)
+    grouped_df = df.sort_values(by=group_cols, kind="stable")
+
+    grouped = grouped_df.groupby(group_cols, sort=False)
+    values = grouped_df[value_col]
+    is_first = grouped.cumcount().to_numpy() == 0
+    next_value = grouped[value_col].shift(-1)
+    group_size = grouped[value_col].transform("size").to_numpy()
+
+    drop = is_first & (group_size > 1) & (values == 0.0).to_numpy() & (next_value != 0.0).to_numpy()
+    if not np.any(drop):
+        return df
+    return grouped_df[~drop]
+
+
+# Rules of detect_revision_outliers; drop a rule to disable it
+OUTLIER_RULES = {
+    # Absolute percentage revision against the previous vintage above the threshold
+    "abs_pct": {"threshold": 10},
+    # Modified z-score (median/MAD) of the revision within the country and debt type
+    "robust_z": {"threshold": 3.5},
+    # Distance of the revision to the rolling median over neighbouring years of the same
+    # vintage, in units of the country's MAD
+    "rolling": {"window": 5, "threshold": 3.5},
+    # Ratio to the previous vintage beyond min_ratio in either direction (redenomination suspect)
+    "ratio_jump": {"min_ratio": 5},
+}
+
+OUTLIER_COLUMNS = [
+    "Country Code", "Country Name", "Residence Name", "Year", "Vintage", "Value", "Value_Diff",
+    "Value_Diff_Perc", "Robust_Z", "Rolling_Score", "Vintage_Ratio", "Flags"
+]
+
+# Consistency constants of the modified z-score (Iglewicz and Hoaglin)
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 0.7979
+
+
+def detect_revision_outliers(df, rules=OUTLIER_RULES, country_cols=("Country Code", "Residence Name")):
+    """
+    Flag vintage revisions that look like outliers, for all countries in one pass.
+
+    Every rule in ``rules`` is evaluated with grouped transforms over the whole panel:
+    ``abs_pct`` thresholds the absolute percentage revision, ``robust_z`` the modified
+    z-score of the revision within its country, ``rolling`` the revision's distance to
+    the rolling median of the neighbouring years of the same vintage, and ``ratio_jump``
+    the ratio between the value and its previous vintage. Countries whose revisions have
+    a MAD of zero are scaled by their mean absolute deviation instead.
+
+    Args:
+        df (pd.DataFrame): Panel with 'Value', 'Value_Diff' and 'Value_Diff_Perc' against
+            the previous vintage.
+        rules (dict): Rule name -> parameters, as in OUTLIER_RULES.
+        country_cols (tuple): Columns over which the robust statistics are computed.
+
+    Returns:
+        pd.DataFrame: The flagged revisions with their scores and a 'Flags' column naming
+        the rules they triggered, sorted by country, debt type, year and vintage.
+    """
+    country_cols = list(country_cols)
+    revisions = df[df["Value_Diff_Perc"].notna()].reset_index(drop=True)
+    pct = revisions["Value_Diff_Perc"].replace([np.inf, -np.inf], np.nan)
+    by_country = [revisions[col] for col in country_cols]
+
+    # Robust location and scale of the revisions of every country
+    median = pct.groupby(by_country, observed=True).transform("median")
+    deviation = (pct - median).abs()
+    mad = deviation.groupby(by_country, observed=True).transform("median") / MAD_SCALE
+    mean_ad = deviation.groupby(by_country, observed=True).transform("mean") / MEAN_AD_SCALE
+    scale = mad.where(mad > 0, mean_ad)
+    scale = scale.where(scale > 0)
+
+    revisions["Robust_Z"] = (pct - median) / scale
+
+    if "rolling" in rules:
+        # Rolling median over the years of each country, debt type and vintage
+        order = revisions.sort_values(by=[*country_cols, "Vintage", "Year"], kind="stable").index
+        rolling_median = (
+            pct[order].groupby([revisions.loc[order, col] for col in [*country_cols, "Vintage"]], observed=True)
+            .rolling(rules["rolling"]["window"], center=True, min_periods=1).median()
+            .droplevel(list(range(len(country_cols) + 1)))
+        )
+        revisions["Rolling_Score"] = (pct - rolling_median) / scale
+    else:
+        revisions["Rolling_Score"] = np.nan
+
+    previous = revisions["Value"] - revisions["Value_Diff"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        revisions["Vintage_Ratio"] = revisions["Value"] / previous.where(previous != 0)
+
+    flags = {}
+    if "abs_pct" in rules:
+        flags["abs_pct"] = revisions["Value_Diff_Perc"].abs() > rules["abs_pct"]["threshold"]
+    if "robust_z" in rules:
+        flags["robust_z"] = revisions["Robust_Z"].abs() > rules["robust_z"]["threshold"]
+    if "rolling" in rules:
+        flags["rolling"] = revisions["Rolling_Score"].abs() > rules["rolling"]["threshold"]
+    if "ratio_jump" in rules:
+        min_ratio = rules["ratio_jump"]["min_ratio"]
+        ratio = revisions["Vintage_Ratio"]
+        flags["ratio_jump"] = (ratio > min_ratio) | ((ratio > 0) & (ratio < 1 / min_ratio))
+
+    # Join the names of the triggered rules, e.g. 'abs_pct;ratio_jump'
+    triggered = pd.DataFrame(flags, index=revisions.index)
+    names = np.array([f"{name};" for name in triggered.columns], dtype=object)
+    revisions["Flags"] = (triggered.to_numpy() * names).sum(axis=1) if len(names) else ""
+    revisions["Flags"] = revisions["Flags"].str.rstrip(";")
+
+    flagged = revisions[triggered.any(axis=1)]
+    columns = [col for col in OUTLIER_COLUMNS if col in flagged.columns]
+    flagged = flagged.sort_values(by=[*country_cols, "Year", "Vintage"], kind="stable")[columns]
+    print(f"Flagged {len(flagged)} of {len(revisions)} revisions: {triggered.sum().to_dict()}")
+    return flagged.reset_index(drop=True)
@@ -0,0 +1,94 @@
+"""Country-indexed Parquet store of the merged vintage panels.
+
+Every indicator's merged panel is written to one Parquet file sorted by Country
+Code, Residence Name, Year and Vintage, with exactly one row group per country.
+The mapping from Country Code to row group is kept in the file metadata, so
+``get_country`` reads the footer and a single row group instead of parsing and
+masking the whole merged CSV.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from hidden_debt_gsf.config import BLD_data
+
+PANEL_STORE_DIR = BLD_data / "Merged" / "panel_store"
+
+INDEX_KEY = b"country_row_groups"
+
+SORT_COLUMNS = ["Country Code", "Residence Name", "Year", "Vintage"]
+
+
+def store_path(indicator, store_dir=PANEL_STORE_DIR):
+    """Return the path of the panel store file of an indicator."""
+    return store_dir / f"{indicator}.parquet"
+
+
+def build_panel_store(merged, output_path):
+    """
+    Write a merged panel as a country-indexed Parquet file.
+
+    Args:
+        merged (pd.DataFrame): Merged long-format panel of one indicator.
+        output_path (Path): Path of the Parquet file to write.
+    """
+    merged = merged.sort_values(by=SORT_COLUMNS, kind="stable").reset_index(drop=True)
+    table = pa.Table.from_pandas(merged, preserve_index=False)
+
+    # Rows of a country are contiguous after sorting, so each one becomes a row group
+    codes = merged["Country Code"].to_numpy()
+    starts = np.flatnonzero(np.r_[len(codes) > 0, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    index = {str(codes[start]): row_group for row_group, start in enumerate(starts)}
+
+    metadata = {**(table.schema.metadata or {}), INDEX_KEY: json.dumps(index).encode()}
+    table = table.replace_schema_metadata(metadata)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with pq.ParquetWriter(output_path, table.schema) as writer:
+        for start, end in zip(starts, ends):
+            writer.write_table(table.slice(int(start), int(end - start)))
+    print(f"Stored {len(merged)} rows of {len(index)} countries in {output_path}")
+
+
+def read_country_index(path):
+    """Return the Country Code -> row group mapping of a panel store file."""
+    metadata = pq.read_schema(path).metadata or {}
+    return {int(code): row_group for code, row_group in json.loads(metadata[INDEX_KEY]).items()}
+
+
+def get_country(code, indicator, residence=None, store_dir=PANEL_STORE_DIR):
+    """
+    Load the merged panel of one country, reading only its row group.
+
+    Args:
+        code (int): Country Code, e.g. 174 for Greece.
+        indicator (str): Indicator name, e.g. 'debt_stock' or 'net_incurrence'.
+        residence (str, optional): Debt type ('total', 'domestic' or 'foreign').
+            All debt types are returned if None.
+        store_dir (Path): Directory of the panel store.
+
+    Returns:
+        pd.DataFrame: The country's rows sorted by Residence Name, Year and Vintage.
+        Empty if the country is not in the panel.
+    """
+    path = store_path(indicator, store_dir)
+    parquet_file = pq.ParquetFile(path)
+    index = read_country_index(path)
+
+    if code not in index:
+        country = parquet_file.schema_arrow.empty_table().to_pandas()
+    else:
+        country = parquet_file.read_row_group(index[code]).to_pandas()
+
+    if residence is not None:
+        country = country[country["Residence Name"] == residence].reset_index(drop=True)
+    return country
+
+
+def read_panel(indicator, columns=None, store_dir=PANEL_STORE_DIR):
+    """Load the full merged panel of an indicator, optionally only some columns."""
+    return pd.read_parquet(store_path(indicator, store_dir), columns=columns)
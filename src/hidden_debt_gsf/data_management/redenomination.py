@@ -0,0 +1,186 @@
+"""Currency redenomination adjustments of the merged vintage panels.
+
+Older vintages of some countries report in a former currency. Each entry of
+REDENOMINATIONS scales the values of one country within an inclusive vintage and
+year range by a fixed factor; a missing bound leaves that side open. All entries
+are applied through one merge on Country Code and a single multiply instead of a
+full scan of the panel per entry.
+"""
+import numpy as np
+import pandas as pd
+
+REDENOMINATIONS = [
+    {
+        "country_code": 913, "country": "Belarus",
+        "vintage_min": None, "vintage_max": 2016, "year_min": None, "year_max": None,
+        "factor": 1/10000,
+        "source": "Web: currency reform 2016 (1 new ruble = 10,000 old rubles)",
+    },
+    {
+        "country_code": 936, "country": "Slovakia",
+        "vintage_min": None, "vintage_max": 2012, "year_min": None, "year_max": 2008,
+        "factor": 1/30.12592,
+        "source": "Difference in Data: reported in Koruny, switched then to Euro",
+    },
+    {
+        "country_code": 961, "country": "Slovenia",
+        "vintage_min": None, "vintage_max": 2012, "year_min": None, "year_max": 2006,
+        "factor": 1/239.6357537,
+        "source": "Difference in Data: reported in Tolars, switched then to Euro",
+    },
+    {
+        "country_code": 132, "country": "France",
+        "vintage_min": None, "vintage_max": 2012, "year_min": None, "year_max": 1989,
+        "factor": 1/6.559527714,
+        "source": "Difference in Data: reported in Franc, switched then to Euro",
+    },
+    {
+        "country_code": 181, "country": "Malta",
+        "vintage_min": None, "vintage_max": 2012, "year_min": None, "year_max": 2007,
+        "factor": 3.03609922,
+        "source": "Difference in Data: reported in Lira, switched then to Euro",
+    },
+    {
+        "country_code": 939, "country": "Estonia",
+        "vintage_min": None, "vintage_max": 2011, "year_min": None, "year_max": 2008,
+        "factor": 1/15.408140379155446,
+        "source": "Difference in Data: reported in Kroon, switched then to Euro",
+    },
+]
+
+LOG_COLUMNS = ["Country Code", "Country Name", "Residence Name", "Year", "Vintage"]
+
+
+def apply_redenominations(df, table=REDENOMINATIONS):
+    """
+    Scale the values of all rows covered by a redenomination entry.
+
+    Args:
+        df (pd.DataFrame): Panel with 'Country Code', 'Vintage', 'Year' and 'Value'.
+        table (list): Redenomination entries as in REDENOMINATIONS.
+
+    Returns:
+        tuple: (``df`` with the adjusted 'Value', DataFrame logging every adjusted row
+        with its value before and after, the factor and the source).
+    """
+    rules = pd.DataFrame(table, columns=list(REDENOMINATIONS[0]))
+    for col, bound in (("vintage_min", -np.inf), ("vintage_max", np.inf), ("year_min", -np.inf), ("year_max", np.inf)):
+        rules[col] = rules[col].astype("float64").fillna(bound)
+
+    rows = pd.DataFrame({
+        "position": np.arange(len(df)),
+        "Country Code": df["Country Code"].to_numpy(),
+        "Vintage": df["Vintage"].to_numpy(),
+        "Year": df["Year"].to_numpy(),
+    })
+    matched = rows.merge(rules, left_on="Country Code", right_on="country_code")
+    matched = matched[
+        matched["Vintage"].between(matched["vintage_min"], matched["vintage_max"]) &
+        matched["Year"].between(matched["year_min"], matched["year_max"])
+    ]
+
+    # Rows covered by several entries are scaled by all of their factors
+    factors = matched.groupby("position")["factor"].prod()
+    values = df["Value"].to_numpy(dtype="float64", copy=True)
+    before = values[factors.index]
+    values[factors.index] = before * factors.to_numpy()
+    adjusted = df.assign(Value=values)
+
+    id_columns = [col for col in LOG_COLUMNS if col in df.columns]
+    log = df.iloc[factors.index][id_columns].assign(
+        Value_Before=before, Value=values[factors.index], Factor=factors.to_numpy()
+    )
+    log["Source"] = matched.groupby("position")["source"].agg("; ".join).to_numpy()
+
+    for (country, factor, source), n_rows in matched.groupby(["country", "factor", "source"], sort=False).size().items():
+        print(f"Redenomination {country}: {n_rows} rows scaled by {factor:.10g} ({source})")
+    return adjusted, log.reset_index(drop=True)
+
+
+def discover_redenominations(df, min_factor=1.5, tolerance=0.02, min_years=3):
+    """
+    Propose redenomination factors from blocks of near-constant ratios between vintages.
+
+    Every value is compared with the same observation (country, debt type, year) in the
+    previous vintage. A redenomination rescales a whole range of years at once, so the
+    log-ratios of one country's vintage transition cluster tightly far from zero. The
+    log-ratios of all transitions are sorted once, and a new block starts wherever the
+    transition changes or the gap to the next log-ratio exceeds ``tolerance``.
+
+    Args:
+        df (pd.DataFrame): Merged panel with 'Country Code', 'Residence Name', 'Year',
+            'Vintage' and 'Value', before any redenomination adjustment.
+        min_factor (float): Smallest ratio (in either direction) considered a rescaling.
+        tolerance (float): Largest gap between neighbouring log-ratios of one block.
+        min_years (int): Smallest number of distinct years a block needs.
+
+    Returns:
+        pd.DataFrame: One candidate per block with the country, last vintage in the old
+        unit ('vintage_max'), first vintage in the new unit, year range, debt types, the
+        factor converting the old vintage to the new one, a confidence score in [0, 1]
+        and whether REDENOMINATIONS already holds a matching entry, best candidates first.
+    """
+    keys = ["Country Code", "Residence Name", "Year"]
+    panel = df.dropna(subset=[*keys, "Vintage", "Value"])
+    panel = panel.sort_values(by=[*keys, "Vintage"], kind="stable")
+    by_observation = panel.groupby(keys, sort=False, observed=True)
+    panel = panel.assign(
+        Previous_Vintage=by_observation["Vintage"].shift(1),
+        Previous_Value=by_observation["Value"].shift(1),
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_ratio = np.log(panel["Value"] / panel["Previous_Value"])
+    rescaled = np.isfinite(log_ratio) & (log_ratio.abs() >= np.log(min_factor))
+    steps = panel[rescaled].assign(Log_Ratio=log_ratio[rescaled])
+
+    # Cluster the sorted log-ratios of every transition into blocks
+    transition = ["Country Code", "Previous_Vintage", "Vintage"]
+    steps = steps.sort_values(by=[*transition, "Log_Ratio"], kind="stable")
+    new_block = np.ones(len(steps), dtype=bool)
+    if len(steps):
+        new_block[1:] = False
+        for col in transition:
+            values = steps[col].to_numpy()
+            new_block[1:] |= values[1:] != values[:-1]
+        ratios = steps["Log_Ratio"].to_numpy()
+        new_block[1:] |= np.diff(ratios) > tolerance
+    steps["Block"] = np.cumsum(new_block)
+
+    blocks = steps.groupby("Block").agg(
+        **{col: (col, "first") for col in transition},
+        year_min=("Year", "min"),
+        year_max=("Year", "max"),
+        n_years=("Year", "nunique"),
+        n_obs=("Year", "size"),
+        debt_types=("Residence Name", lambda types: ";".join(sorted(set(map(str, types))))),
+        log_factor=("Log_Ratio", "median"),
+        mad=("Log_Ratio", lambda ratios: (ratios - ratios.median()).abs().median()),
+    )
+    blocks = blocks[blocks["n_years"] >= min_years]
+
+    candidates = pd.DataFrame({
+        "country_code": blocks["Country Code"].astype(int),
+        "vintage_max": blocks["Previous_Vintage"].astype(int),
+        "vintage_next": blocks["Vintage"].astype(int),
+        "year_min": blocks["year_min"].astype(int),
+        "year_max": blocks["year_max"].astype(int),
+        "n_years": blocks["n_years"],
+        "n_obs": blocks["n_obs"],
+        "debt_types": blocks["debt_types"],
+        "factor": np.exp(blocks["log_factor"]),
+        # More observations and a tighter block give more confidence
+        "confidence": (
+            (1 - np.exp(-blocks["n_obs"] / (2 * min_years)))
+            * np.clip(1 - blocks["mad"] / tolerance, 0, 1)
+        ),
+    })
+
+    known = pd.DataFrame(REDENOMINATIONS, columns=list(REDENOMINATIONS[0]))[["country_code", "factor"]]
+    matches = candidates.reset_index().merge(known, on="country_code", suffixes=("", "_known"))
+    matches = matches[np.abs(np.log(matches["factor"] / matches["factor_known"])) <= tolerance]
+    candidates["known"] = candidates.index.isin(matches["Block"])
+
+    candidates = candidates.sort_values(by=["confidence", "n_obs"], ascending=False, kind="stable")
+    print(f"Found {len(candidates)} redenomination candidates in {candidates['country_code'].nunique()} countries")
+    return candidates.reset_index(drop=True)
@@ -0,0 +1,102 @@
+"""Per-sector datasets, vintage revisions and histograms of the GFSIBS net incurrence data.
+
+``process_sector`` handles one Sector Code on its own, so task_all_sectors_fix_gfsibs
+can run the sectors on a process pool.
+"""
+import pandas as pd
+import plotly.express as px
+from hidden_debt_gsf.data_management.vintage_revisions import revisions_from_wide
+from hidden_debt_gsf.final.plot.rendering import figure_spec
+
+# Names of the Sector Codes, for the histogram titles
+SECTOR_NAMES = {
+    "S1311B": "Budgetary central government",
+    "S1311": "Central government (excl. social security funds)",
+    "S1321": "Central government (incl. social security funds)",
+    "S13112": "Extrabudgetary central government",
+    "S13": "General government",
+    "S1313": "Local governments",
+    "S1314": "Social security funds",
+    "S1312": "State governments"
+}
+
+
+def stata_compatible(df):
+    """
+    Convert the object columns of a DataFrame to types Stata can store.
+
+    Every object column is classified once with ``infer_dtype`` (skipping nulls)
+    instead of testing each cell: all-null columns become float, string columns
+    become str, and any other content raises a ValueError.
+    """
+    conversions = {}
+    for col in df.columns[df.dtypes == "object"]:
+        inferred = pd.api.types.infer_dtype(df[col], skipna=True)
+        if inferred == "empty":
+            # Convert all-null object columns to float
+            conversions[col] = float
+        elif inferred == "string":
+            # Convert object columns with strings or nulls to string
+            conversions[col] = str
+        else:
+            raise ValueError(f"Unsupported column data type in '{col}' for Stata export.")
+    return df.astype(conversions)
+
+
+def process_sector(sector_code, sector_data, output_dir, hist_dir):
+    """
+    Write the dataset and the vintage revisions of one sector and create its histogram.
+
+    Args:
+        sector_code (str): Sector Code of the rows.
+        sector_data (pd.DataFrame): Filtered rows of the sector.
+        output_dir (Path): Directory of the sector datasets.
+        hist_dir (Path): Directory of the histograms.
+
+    Returns:
+        dict: Figure spec of the histogram of the percentage changes.
+    """
+    # Sort data by Country Code and Vintage, with all columns of supported types
+    sector_data = stata_compatible(sector_data.sort_values(by=['Country Code', 'Vintage']))
+
+    # Save the dataset to the output directory
+    sector_data.to_stata(output_dir / f"sector_{sector_code}.dta")
+
+    # Identify year columns
+    year_columns = [col for col in sector_data.columns if col.isdigit() and 1970 <= int(col) <= 2020]
+
+    # Calculate differences and percentage changes across vintages
+    difference_data = revisions_from_wide(sector_data, year_columns)
+
+    # Save the result to a CSV file
+    difference_data.to_csv(output_dir / f"sector_{sector_code}_pivot.csv", index=False)
+
+    # Create the interactive histogram for Percent_Change
+    percent_changes = difference_data['Percent_Change'].dropna()
+    percent_changes = percent_changes[(percent_changes != 0) & (percent_changes >= -50) & (percent_changes <= 50)]
+
+    # Calculate the mean of percentage changes
+    mean_percent_change = percent_changes.mean()
+    num_observations = percent_changes.count()
+    # Get the sector name for the title
+    sector_name = SECTOR_NAMES.get(sector_code, "Unknown Sector")
+
+    # Create Plotly histogram with the mean in the title
+    fig = px.histogram(
+        percent_changes, 
+        nbins=500, 
+        title=(
+            f"Net incurrence of Liabilities: Histogram of Percentual Changes between Vintages for Sector {sector_name} ({sector_code})<br>"
+            f"Mean Percent Change: {mean_percent_change:.2f}% | Observations: {num_observations}, no zeros, capped at |20|"
+        ),
+        labels={'value': 'Percent Change (%)'},
+        template='plotly_white'
+    )
+    fig.update_layout(
+        xaxis_title="Percent Change (%)",
+        yaxis_title="Frequency",
+        title_x=0.5,
+        xaxis_range=[-20, 20]  # Restrict the x-axis range
+    )
+
+    return figure_spec(fig, hist_dir / f"sector_{sector_code}_histogram.html")
@@ -0,0 +1,26 @@
+from pytask import task
+from hidden_debt_gsf.data_management.web_csv import (
+    WEB_CSV_YEARS,
+    csv_path,
+    parquet_paths,
+    write_gfsibs_cache,
+)
+
+for year in WEB_CSV_YEARS:
+
+    @task(id=str(year))
+    def task_cache_gfsibs(
+            depends_on=csv_path(year),
+            produces=parquet_paths(year)
+    ):
+        """
+        Converts one GFSIBS WEB_CSV vintage into typed Parquet files, so that
+        downstream tasks parse the multi-hundred-MB CSV only once per build. The
+        attribute rows keep their row numbers in the CSV, so readers can restore
+        the source row order.
+
+        Args:
+            depends_on (Path): Path to the raw ``GFSIBS{year}.csv`` file.
+            produces (dict): Paths to the value, attribute, sparse entry and coverage Parquet files.
+        """
+        write_gfsibs_cache(depends_on, produces)
@@ -0,0 +1,22 @@
+from pytask import task
+from hidden_debt_gsf.data_management.coverage_index import build_coverage_index, coverage_path, write_coverage_index
+from hidden_debt_gsf.data_management.web_csv import WEB_CSV_YEARS, parquet_paths
+
+for year in WEB_CSV_YEARS:
+
+    @task(id=str(year))
+    def task_coverage_index(
+            year=year,
+            cache=parquet_paths(year),
+            produces=coverage_path(year)
+    ):
+        """
+        Builds the coverage index of one WEB_CSV vintage: entry counts and covered
+        countries per flow, sector, unit, residence and instrument.
+
+        Args:
+            year (int): Vintage to index.
+            cache (dict): Parquet cache files of the vintage.
+            produces (Path): Path to the coverage index Parquet file.
+        """
+        write_coverage_index(build_coverage_index(year), produces)
@@ -1,7 +1,10 @@
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from hidden_debt_gsf.config import SRC, BLD_data, BLD_figures
-import plotly.express as px
+from hidden_debt_gsf.config import SRC, BLD_data, BLD_figures, N_WORKERS
+from hidden_debt_gsf.data_management.most_populated import select_most_populated
+from hidden_debt_gsf.data_management.sector_datasets import process_sector
+from hidden_debt_gsf.final.plot.rendering import PLOTLY_JS, render_figures
 
 def task_most_populated_combinations_fix_gfsibs(
         depends_on=BLD_data / "Merged" / "filtered_merged_gsfibs.csv",
@@ -18,12 +21,7 @@ def task_most_populated_combinations_fix_gfsibs(
     """
     merged_df = pd.read_csv(depends_on)
 
-    # Step 1: Initialize an empty list to store the most populated sector and classification data per country
-    most_populated_combinations = []
-
-    # Step 2: Get a list of unique country codes
-    unique_countries = merged_df['Country Code'].unique()
-
+    # Step 1: Filter the data for the relevant conditions
     filtered_df = merged_df[
             (merged_df['Attribute'] == 'Value') & 
             (merged_df['Unit Code'] == 'XDC') & # Domestic Currency
@@ -32,56 +30,36 @@ def task_most_populated_combinations_fix_gfsibs(
             (merged_df['Stocks, Transactions, and Other Flows Code'] == 'G33') # Net incurrence of liabilities
         ]
 
-    # Step 3: Iterate over each country and process its data
-    for country_code in unique_countries:
-        # Filter data for the current country
-        country_data = filtered_df[
-            (merged_df['Country Code'] == country_code)
-        ]
+    # Step 2: Identify year columns (1970 to 2020)
+    year_columns = [col for col in filtered_df.columns if col.isdigit() and 1970 <= int(col) <= 2020]
 
-        # Skip if no data for the country
-        if country_data.empty:
-            continue
-
-        # Identify year columns (1970 to 2020)
-        year_columns = [col for col in country_data.columns if col.isdigit() and 1970 <= int(col) <= 2020]
-
-        # Identify the most populated combination of Sector Code and Classification Code for the current country
-        most_data_entries = (
-            country_data
-            .groupby(['Sector Code'])[year_columns]
-            .apply(lambda group: group.notna().sum().sum())
-            .reset_index(name='Data Entry Count')
-            .sort_values(by='Data Entry Count', ascending=False)
-        )
-
-        # Get the most populated combination
-        if not most_data_entries.empty:
-            most_populated_combination = most_data_entries.iloc[0][['Sector Code']]
-            
-            # Filter data for the most populated combination
-            most_populated_combination_data = country_data[
-                (country_data['Sector Code'] == most_populated_combination['Sector Code'])
-            ]
-            
-            # Append the result to the list
-            most_populated_combinations.append(most_populated_combination_data)
-
-    # Step 4: Combine all the most populated combination data into a single DataFrame
-    combined_most_populated_combinations = pd.concat(most_populated_combinations, ignore_index=True)
+    # Step 3: Keep the most populated Sector Code for every country
+    combined_most_populated_combinations = select_most_populated(
+        filtered_df,
+        combination_cols=['Sector Code'],
+        year_columns=year_columns,
+        country_order=merged_df['Country Code'].unique()
+    )
 
     # Save the combined data to a .dta file
     combined_most_populated_combinations.to_stata(produces)
 
 def task_all_sectors_fix_gfsibs(
-        depends_on=BLD_data / "Merged" / "filtered_merged_gsfibs.csv"
+        depends_on=BLD_data / "Merged" / "filtered_merged_gsfibs.csv",
+        plotly_js=PLOTLY_JS,
+        n_workers=N_WORKERS
 ):
     """
     Processes the filtered data to generate separate datasets for each unique combination of Sector Code,
     calculates percentage changes, and creates interactive histograms for each sector.
 
+    The filtered data is split by Sector Code once, and the sectors are processed
+    concurrently on a process pool when ``n_workers > 1``.
+
     Args:
         depends_on (str): Path to the filtered data in parquet format.
+        plotly_js (Path): Shared plotly.js bundle referenced by the histograms.
+        n_workers (int): Worker processes for the sectors (1 = sequential).
     """
 
     # Step 1: Load the data
@@ -96,21 +74,6 @@ def task_all_sectors_fix_gfsibs(
         (merged_df['Stocks, Transactions, and Other Flows Code'] == 'G33')  # Net incurrence of liabilities
     ]
 
-    # Step 3: Create mapping of Sector Codes to Sector Names
-    sector_mapping = {
-        "S1311B": "Budgetary central government",
-        "S1311": "Central government (excl. social security funds)",
-        "S1321": "Central government (incl. social security funds)",
-        "S13112": "Extrabudgetary central government",
-        "S13": "General government",
-        "S1313": "Local governments",
-        "S1314": "Social security funds",
-        "S1312": "State governments"
-    }
-
-    # Get unique Sector Codes
-    unique_sector_codes = filtered_df['Sector Code'].unique()
-
     output_dir = BLD_data / "DTA" / "GFSIBS" / "sector_datasets"
     hist_dir = BLD_figures / "Hist_pivot"
 
@@ -118,102 +81,24 @@ def task_all_sectors_fix_gfsibs(
     output_dir.mkdir(parents=True, exist_ok=True)
     hist_dir.mkdir(parents=True, exist_ok=True)
 
-    # Step 4: Process data for each sector
-    for sector_code in unique_sector_codes:
-        # Filter data for the current Sector Code
-        sector_data = filtered_df[filtered_df['Sector Code'] == sector_code]
-
-        # Skip if no data for the sector
-        if sector_data.empty:
-            continue
-
-        # Sort data by Country Code and Vintage
-        sector_data = sector_data.sort_values(by=['Country Code', 'Vintage'])
-
-        # Ensure all columns are of supported types
-        for col in sector_data.columns:
-            if sector_data[col].dtype == "object":
-                if sector_data[col].isnull().all():
-                    # Convert all-null object columns to float
-                    sector_data[col] = sector_data[col].astype(float)
-                elif sector_data[col].apply(lambda x: isinstance(x, str) or pd.isnull(x)).all():
-                    # Convert object columns with strings or nulls to string
-                    sector_data[col] = sector_data[col].astype(str)
-                else:
-                    raise ValueError(f"Unsupported column data type in '{col}' for Stata export.")
-
-
-        # Create a file name for the dataset
-        file_name = f"sector_{sector_code}.dta"
-
-        # Save the dataset to the output directory
-        sector_data.to_stata(output_dir / file_name)
-
-        # Identify year columns
-        year_columns = [col for col in sector_data.columns if col.isdigit() and 1970 <= int(col) <= 2020]
-
-        # Reshape data for analysis
-        pivot_data = (
-            sector_data.melt(
-                id_vars=['Country Code', 'Vintage'], 
-                value_vars=year_columns, 
-                var_name='Year', 
-                value_name='Value'
-            )
-        )
-
-        # Ensure 'Value' is numeric
-        pivot_data['Value'] = pd.to_numeric(pivot_data['Value'], errors='coerce')
-
-        # Calculate differences and percentage changes across vintages
-        pivot_data['Year'] = pivot_data['Year'].astype(int)
-        pivot_data['Vintage'] = pivot_data['Vintage'].astype(str)
-
-        difference_data = (
-            pivot_data
-            .sort_values(by=['Country Code', 'Year', 'Vintage'])
-            .groupby(['Country Code', 'Year'], group_keys=False)
-            .apply(lambda group: group.assign(
-                Difference=group['Value'].diff(), 
-                Percent_Change=group['Value'].pct_change() * 100
-            ))
-            .dropna(subset=['Difference', 'Percent_Change'])  # Remove rows with NaN in either column
-        )
-
-        # Save the result to a CSV file
-        file_name_pivot = f"sector_{sector_code}_pivot.csv"
-        difference_data.to_csv(output_dir / file_name_pivot, index=False)
-
-        # Step 7: Create and save interactive histograms for Percent_Change
-        percent_changes = difference_data['Percent_Change'].dropna()
-        percent_changes = percent_changes[(percent_changes != 0) & (percent_changes >= -50) & (percent_changes <= 50)]
-
-        # Calculate the mean of percentage changes
-        mean_percent_change = percent_changes.mean()
-        num_observations = percent_changes.count()
-        # Get the sector name for the title
-        sector_name = sector_mapping.get(sector_code, "Unknown Sector")
-
-        # Create Plotly histogram with the mean in the title
-        fig = px.histogram(
-            percent_changes, 
-            nbins=500, 
-            title=(
-                f"Net incurrence of Liabilities: Histogram of Percentual Changes between Vintages for Sector {sector_name} ({sector_code})<br>"
-                f"Mean Percent Change: {mean_percent_change:.2f}% | Observations: {num_observations}, no zeros, capped at |20|"
-            ),
-            labels={'value': 'Percent Change (%)'},
-            template='plotly_white'
-        )
-        fig.update_layout(
-            xaxis_title="Percent Change (%)",
-            yaxis_title="Frequency",
-            title_x=0.5,
-            xaxis_range=[-20, 20]  # Restrict the x-axis range
-        )
-
-        # Save the histogram as an HTML file
-        hist_file_name = f"sector_{sector_code}_histogram.html"
-        fig.write_html(hist_dir / hist_file_name)
-
-    print(f"Datasets and histograms have been saved to {output_dir} and {hist_dir}")
\ No newline at end of file
+    # Step 3: Split the data by Sector Code once, in order of first appearance
+    sectors = list(filtered_df.groupby('Sector Code', sort=False))
+
+    # Step 4: Process the sectors, on a process pool if requested
+    if n_workers > 1 and len(sectors) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(sectors))) as executor:
+            futures = [
+                executor.submit(process_sector, sector_code, sector_data, output_dir, hist_dir)
+                for sector_code, sector_data in sectors
+            ]
+            hist_specs = [future.result() for future in futures]
+    else:
+        hist_specs = [
+            process_sector(sector_code, sector_data, output_dir, hist_dir)
+            for sector_code, sector_data in sectors
+        ]
+
+    # Step 5: Render the histograms of all sectors as HTML files
+    render_figures(hist_specs, n_workers=n_workers, plotly_js=plotly_js)
+
+    print(f"Datasets and histograms have been saved to {output_dir} and {hist_dir}")
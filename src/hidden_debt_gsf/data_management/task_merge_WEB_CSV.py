@@ -1,60 +1,65 @@
 import pandas as pd
-from hidden_debt_gsf.config import SRC, BLD_data
+from hidden_debt_gsf.config import BLD_data
+from hidden_debt_gsf.data_management.web_csv import (
+    CHUNK_SIZE,
+    WEB_CSV_YEARS,
+    csv_path,
+    filter_keywords,
+    gfsibs_columns,
+    iter_gfsibs,
+    parquet_paths,
+)
 
 def task_merge_gfsibs(
         depends_on=BLD_data / ".dir_created",
+        cache={year: parquet_paths(year) for year in WEB_CSV_YEARS},
+        chunksize=CHUNK_SIZE,
         produces=BLD_data / "Merged" / "filtered_merged_gsfibs.csv"
 ):
     """
     Filters and merges data from multiple CSV files based on keywords.
 
+    Every vintage is streamed in chunks and only the filtered rows are kept, so peak
+    memory is bounded by the chunk size and the filtered rows of one vintage, not the
+    file size. The rows of a vintage are written in keyword order and, within a
+    keyword, in the order of the source CSV.
+
     Args:
+        cache (dict): Vintage -> Parquet cache files of the WEB_CSV vintage.
+        chunksize (int): Number of rows read and filtered at a time.
         produces (str): Path to the output CSV file.
     """
     keywords = ["debt", "liabilities", "borrowing"]
-    years = [2014, 2015, 2016, 2017, 2019, 2020, 2024]
 
-    def filter_and_combine(data, column_name, keywords):
-        """
-        Filter rows based on multiple keywords and return combined results
-        without duplicates.
-        """
-        combined_rows = pd.DataFrame()
-        for keyword in keywords:
-            # Filter rows matching the keyword
-            filtered_rows = data[data[column_name].str.contains(keyword, case=False, na=False)].copy()
-            combined_rows = pd.concat([combined_rows, filtered_rows], ignore_index=True)
+    # Every vintage is a dependency through its cache, so all CSV files exist here
+    years = list(cache)
 
-        # Drop duplicate rows based on all columns
-        combined_rows = combined_rows.drop_duplicates()
+    # The output holds the union of all vintages' columns, in order of first appearance
+    columns = []
+    for year in years:
+        for col in [*gfsibs_columns(year), 'Vintage']:
+            if col not in columns:
+                columns.append(col)
 
-        return combined_rows
+    with open(produces, "w", newline="") as output:
+        pd.DataFrame(columns=columns).to_csv(output, index=False)
 
-    # Initialize an empty list to collect filtered data
-    filtered_data_chunks = []
+        # Loop through the years and stream each CSV file
+        for year in years:
+            print(f"Processing file for {year}: {csv_path(year)}")
 
-    # Loop through the years and process each CSV file
-    for year in years:
-        csv_path = SRC / "data" / "WEB_CSV" / f"GFSIBS{year}.csv"
-
-        if csv_path.exists():
-            print(f"Processing file for {year}: {csv_path}")
-
-            vintage_data = pd.read_csv(csv_path)
-            # Add a vintage column
-            vintage_data['Vintage'] = year
-
-            # Filter the vintage
-            filtered_data = filter_and_combine(vintage_data, 'Stocks, Transactions, and Other Flows Name', keywords)
-            # Append filtered chunk to the list
-            filtered_data_chunks.append(filtered_data)
-        else:
-            print(f"CSV file not found for {year}: {csv_path}")
-
-    # Combine all filtered data and save as CSV
-    if filtered_data_chunks:
-        final_filtered_data = pd.concat(filtered_data_chunks, ignore_index=True)
-        final_filtered_data.to_csv(produces, index=False)
-        print(f"Filtered data saved to {produces}")
-    else:
-        print("No data to save.")
+            # Filter the chunks, which are indexed by their rows in the source CSV
+            filtered_chunks = [
+                filter_keywords(chunk, 'Stocks, Transactions, and Other Flows Name', keywords)
+                for chunk in iter_gfsibs(year, chunksize=chunksize)
+            ]
+            filtered_data = pd.concat(filtered_chunks).sort_index(kind="stable")
+
+            # Order the vintage by keyword as a whole and append it to the output
+            filtered_data = filter_keywords(filtered_data, 'Stocks, Transactions, and Other Flows Name', keywords)
+            filtered_data['Vintage'] = year
+            filtered_data.reindex(columns=columns).to_csv(output, header=False, index=False)
+
+            print(f"Appended {len(filtered_data)} filtered rows for {year}")
+
+    print(f"Filtered data saved to {produces}")
@@ -0,0 +1,37 @@
+from hidden_debt_gsf.config import BLD_data, N_WORKERS
+from hidden_debt_gsf.data_management.merge_indicators import (
+    CSV_YEARS,
+    DATA_PATH,
+    DTA_YEARS,
+    INDICATORS,
+    VINTAGE_CACHE_DIR,
+    clean_and_save_to_stata,
+    main_pipeline_filtered,
+)
+from hidden_debt_gsf.data_management.web_csv import parquet_paths
+
+
+def task_merge_all_indicators(
+        depends_on=BLD_data / ".dir_created",
+        cache={year: parquet_paths(year) for year in CSV_YEARS},
+        n_workers=N_WORKERS,
+        produces={name: spec["produces"] for name, spec in INDICATORS.items()}
+    ):
+    """
+    Merges the CDROM DTA and WEB_CSV vintages for every indicator in INDICATORS
+    (debt stock, net incurrence of liabilities) in one shared scan over the sources.
+    Unchanged vintages are reused from VINTAGE_CACHE_DIR, so a new vintage only costs
+    its own processing and the vintage differences of the groups it touches.
+
+    Args:
+        cache (dict): Parquet cache files of the WEB_CSV vintages.
+        n_workers (int): Worker processes for the vintages (1 = sequential).
+        produces (dict): Indicator name -> paths of its merged .csv and .dta files.
+    """
+    merged = main_pipeline_filtered(DATA_PATH, DTA_YEARS, CSV_YEARS, specs=INDICATORS, n_workers=n_workers,
+                                    cache_dir=VINTAGE_CACHE_DIR)
+
+    for name, paths in produces.items():
+        # Save the merged data of all debt types as CSV and Stata file.
+        merged[name].to_csv(paths['csv'], index=False)
+        clean_and_save_to_stata(df=merged[name], output_path=paths['dta'])
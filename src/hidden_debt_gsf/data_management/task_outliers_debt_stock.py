@@ -1,9 +1,15 @@
 import pandas as pd
 from hidden_debt_gsf.config import BLD_data
+from hidden_debt_gsf.data_management.outliers import OUTLIER_RULES, detect_revision_outliers, drop_initial_zero_entries
+from hidden_debt_gsf.data_management.redenomination import apply_redenominations
 
 def task_generate_country_specific_files(
         depends_on=BLD_data / "Merged" / "all_types_debt_stock.csv",
-        produces=BLD_data / "Merged" / "debt_stock_outlier_filtered.dta"
+        produces={
+            "dta": BLD_data / "Merged" / "debt_stock_outlier_filtered.dta",
+            "redenominations": BLD_data / "Merged" / "debt_stock_redenominations.csv",
+            "outliers": BLD_data / "Merged" / "debt_stock_outliers.csv"
+        }
 ):
     # Read CSV file
     combined_data = pd.read_csv(depends_on)
@@ -11,51 +17,12 @@ def task_generate_country_specific_files(
     # Sort by Country Code, Year, and Vintage to ensure correct ordering
     combined_data = combined_data.sort_values(by=["Country Code", "Year", "Vintage", "Residence Name"])
 
-    # Function to remove the first row where Value == 0.0 *only if* the next Vintage has a nonzero value
-    def drop_initial_zero_entries(group):
-        if len(group) > 1 and group["Value"].iloc[0] == 0.0 and group["Value"].iloc[1] != 0.0:
-            return group.iloc[1:]  # Drop first row
-        return group  # Keep all rows if condition is not met
+    # Remove the first row where Value == 0.0 *only if* the next Vintage has a nonzero value
+    combined_data = drop_initial_zero_entries(combined_data)
 
-    # Apply function to each group
-    combined_data = combined_data.groupby(["Country Code", "Year", "Residence Name"], group_keys=False).apply(drop_initial_zero_entries)
-
-    # Country specific adjustments:
-    # Belarus: currency reform 2016 (1 new ruble = 10,000 old rubles)
-    combined_data.loc[
-        (combined_data["Country Code"] == 913) & (combined_data["Vintage"] < 2017),
-        "Value"
-    ] *= 1/10000 # Source: Web
-
-    # Slovakia: currency change: reported in Koruny, switched then to Euro
-    combined_data.loc[
-        (combined_data["Country Code"] == 936) & (combined_data["Vintage"] <= 2012) & (combined_data["Year"] <= 2008),
-        "Value"
-    ] *= 1/30.12592 # Source: Difference in Data
-
-    # Slovenia: currency change: reported in Tolars, switched then to Euro
-    combined_data.loc[
-        (combined_data["Country Code"] == 961) & (combined_data["Vintage"] <= 2012) & (combined_data["Year"] <= 2006),
-        "Value"
-    ] *= 1/239.6357537 # Source: Difference in Data
-
-    # France: currency change: reported in Franc, switched then to Euro
-    combined_data.loc[
-        (combined_data["Country Code"] == 132) & (combined_data["Vintage"] <= 2012) & (combined_data["Year"] <= 1989),
-        "Value"
-    ] *= 1/6.559527714 # Source: Difference in Data
-
-    # Malta: currency change: reported in Lira, switched then to Euro
-    combined_data.loc[
-        (combined_data["Country Code"] == 181) & (combined_data["Vintage"] <= 2012) & (combined_data["Year"] <= 2007),
-        "Value"
-    ] *= 3.03609922 # Source: Difference in Data
-
-    # Estonia: currency change: reported in Kroon, switched then to Euro
-    combined_data.loc[
-        (combined_data["Country Code"] == 939) & (combined_data["Vintage"] < 2012) & (combined_data["Year"] <= 2008),
-        "Value"
-    ] *= 1/15.408140379155446 # Source: Difference in Data
+    # Country specific adjustments: currency redenominations of older vintages
+    combined_data, redenominations = apply_redenominations(combined_data)
+    redenominations.to_csv(produces["redenominations"], index=False)
 
     # Compute the difference in Value with respect to the previous vintage within each group
     combined_data["Value_Diff"] = combined_data.groupby(["Country Code", "Year", "Residence Name"])["Value"].diff()
@@ -66,6 +33,11 @@ def task_generate_country_specific_files(
     # Calculate absolute percentual change for "Value_Diff_Perc"
     combined_data["Abs_Diff_Perc"] = combined_data["Value_Diff_Perc"].abs()
 
+    # Flag the outlying revisions of all countries in one table
+    rules = {**OUTLIER_RULES, "abs_pct": {"threshold": 10}}
+    outliers = detect_revision_outliers(combined_data, rules)
+    outliers.to_csv(produces["outliers"], index=False)
+
     def clean_and_save_to_stata(df, output_path):
         """
         Cleans the given DataFrame to ensure compatibility with Stata and saves it as a .dta file.
@@ -91,34 +63,7 @@ def task_generate_country_specific_files(
         df.to_stata(output_path, write_index=False)
         print(f"Saved cleaned dataset to {output_path}")
 
-    clean_and_save_to_stata(combined_data,produces)
+    clean_and_save_to_stata(combined_data,produces["dta"])
     
-    # Identify unique countries
-    unique_countries = combined_data["Country Code"].unique()
-
-    # Base directory for country analysis
-    country_analysis_dir = BLD_data / "Country_analysis"
-    country_analysis_dir.mkdir(exist_ok=True)
-
-    # # Iterate over each country and generate CSV files
-    # for country in unique_countries:
-    #     # Create country-specific folder
-    #     country_folder = country_analysis_dir / str(country)
-    #     country_folder.mkdir(exist_ok=True)
-
-    #     # Filter data for the specific country
-    #     country_data = combined_data[combined_data["Country Code"] == country]
-
-    #     country_data["Abs_Diff_Perc"] = pd.to_numeric(country_data["Abs_Diff_Perc"], errors="coerce").fillna(0).astype(int)
-
-    #     # Filter only outliers
-    #     country_outliers = country_data[country_data["Abs_Diff_Perc"] > 10]
-
-    #     # Save all data for the country
-    #     country_data.to_csv(country_folder / f"{country}_debt_stock.csv", index=False)
-
-    #     # Save outliers only for the country
-    #     country_outliers.to_csv(country_folder / f"{country}_debt_stock.csv", index=False)
-
-    print("Country-specific files generated successfully.")
+    print("Outlier-filtered data and outlier table generated successfully.")
 
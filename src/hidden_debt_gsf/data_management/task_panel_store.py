@@ -0,0 +1,21 @@
+import pandas as pd
+from pytask import task
+from hidden_debt_gsf.data_management.merge_indicators import INDICATORS
+from hidden_debt_gsf.data_management.panel_store import build_panel_store, store_path
+
+for name, spec in INDICATORS.items():
+
+    @task(id=name)
+    def task_build_panel_store(
+            depends_on=spec["produces"]["csv"],
+            produces=store_path(name)
+    ):
+        """
+        Converts the merged CSV of one indicator into the country-indexed panel store,
+        so that per-country lookups read one row group instead of the whole CSV.
+
+        Args:
+            depends_on (Path): Path to the merged ``all_types_*.csv`` file.
+            produces (Path): Path to the panel store Parquet file.
+        """
+        build_panel_store(pd.read_csv(depends_on), produces)
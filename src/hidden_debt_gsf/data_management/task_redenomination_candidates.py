@@ -0,0 +1,23 @@
+import pandas as pd
+from hidden_debt_gsf.config import BLD_data
+from hidden_debt_gsf.data_management.merge_indicators import INDICATORS
+from hidden_debt_gsf.data_management.redenomination import discover_redenominations
+
+
+def task_redenomination_candidates(
+        depends_on={name: spec["produces"]["csv"] for name, spec in INDICATORS.items()},
+        produces=BLD_data / "Merged" / "redenomination_candidates.csv"
+):
+    """
+    Screens the merged panels of all indicators for blocks of near-constant ratios
+    between vintages and lists the candidate redenomination factors for review.
+
+    Args:
+        depends_on (dict): Indicator name -> merged ``all_types_*.csv`` file.
+        produces (Path): Path to the candidates CSV, best candidates first per indicator.
+    """
+    candidates = [
+        discover_redenominations(pd.read_csv(path)).assign(Indicator=name)
+        for name, path in depends_on.items()
+    ]
+    pd.concat(candidates, ignore_index=True).to_csv(produces, index=False)
@@ -0,0 +1,86 @@
+"""Decoder for the TimeSeriesKey strings of the CDROM DTA vintages.
+
+A key such as ``174_aB_GG_631`` is made of underscore-separated tokens: the country
+prefix, a basis token (``a``/``c`` for accrual/cash followed by a variant letter,
+e.g. ``B`` or ``Z``) and the series suffix, whose last two tokens are the sector
+and the classification item. Keys repeat for every year of their series, so each
+distinct key is decoded once into a lookup table and rows are matched against it
+through categorical codes.
+"""
+import numpy as np
+import pandas as pd
+
+KEY_FIELDS = ["Country", "Basis", "Variant", "Sector", "Item"]
+
+
+def decode_keys(keys):
+    """
+    Split distinct TimeSeriesKeys into their fields.
+
+    Args:
+        keys (array-like): TimeSeriesKey strings; duplicates are decoded once.
+
+    Returns:
+        pd.DataFrame: One row per distinct key with the column 'TimeSeriesKey' and the
+        categorical KEY_FIELDS. Fields a key does not have are NaN.
+    """
+    distinct = pd.Series(pd.unique(pd.Series(keys, dtype=object).dropna().astype(str)), dtype=object)
+    tokens = distinct.str.rsplit("_", n=2, expand=True).reindex(columns=range(3))
+    basis = distinct.str.extract(r"_([ac])([A-Z])_")
+
+    decoded = pd.DataFrame({
+        "TimeSeriesKey": distinct,
+        "Country": distinct.str.split("_", n=1).str[0],
+        "Basis": basis[0],
+        "Variant": basis[1],
+        "Sector": tokens[1],
+        "Item": tokens[2],
+    })
+    return decoded.astype({field: "category" for field in KEY_FIELDS})
+
+
+def extend_key_table(key_table, keys):
+    """Return ``key_table`` with the keys in ``keys`` it does not hold yet decoded and appended."""
+    new_keys = pd.Index(pd.unique(pd.Series(keys, dtype=object).dropna().astype(str)))
+    if key_table is not None:
+        new_keys = new_keys.difference(key_table["TimeSeriesKey"])
+        if new_keys.empty:
+            return key_table
+    decoded = decode_keys(new_keys)
+    if key_table is None:
+        return decoded
+    combined = pd.concat(
+        [key_table.astype({field: object for field in KEY_FIELDS}), decoded.astype({field: object for field in KEY_FIELDS})],
+        ignore_index=True,
+    )
+    return combined.astype({field: "category" for field in KEY_FIELDS})
+
+
+def label_keys(key_table, suffix_to_key):
+    """
+    Attach the indicator and debt type to every key whose series suffix is requested.
+
+    Args:
+        key_table (pd.DataFrame): Decoded keys as returned by ``decode_keys``.
+        suffix_to_key (dict): Suffix such as 'GG_631' -> (indicator, debt type).
+
+    Returns:
+        pd.DataFrame: The rows of ``key_table`` with a requested suffix, with the
+        columns 'Indicator' and 'Residence Name' added.
+    """
+    suffixes = pd.DataFrame(
+        [(*suffix.rsplit("_", 1), indicator, debt_type) for suffix, (indicator, debt_type) in suffix_to_key.items()],
+        columns=["Sector", "Item", "Indicator", "Residence Name"],
+    )
+    keys = key_table.astype({"Sector": object, "Item": object})
+    labelled = keys.merge(suffixes, on=["Sector", "Item"], how="inner")
+    return labelled.astype({"Sector": "category", "Item": "category"})
+
+
+def lookup_keys(keys, key_table):
+    """
+    Return the row of ``key_table`` for every key in ``keys`` as integer positions.
+
+    Keys missing from the table get position -1.
+    """
+    return pd.Categorical(keys, categories=key_table["TimeSeriesKey"]).codes.astype(np.int64)
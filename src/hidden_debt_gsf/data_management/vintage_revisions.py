@@ -0,0 +1,89 @@
+"""Vectorized revisions between consecutive vintages of the same observation."""
+import numpy as np
+from hidden_debt_gsf.data_management.wide_to_long import wide_to_long
+
+
+def vintage_revisions(df, group_cols, order_col="Vintage", value_col="Value",
+                      diff_col="Difference", pct_col="Percent_Change", step_col=None):
+    """
+    Compute the revision of every value relative to the previous vintage of its group.
+
+    Equivalent to sorting by ``group_cols + [order_col]`` and running
+    ``groupby(group_cols).apply(lambda g: g.assign(Difference=g[value_col].diff(),
+    Percent_Change=g[value_col].pct_change() * 100))``, but works on the sorted
+    value array directly: group boundaries are found by comparing each row's keys
+    with the previous row's, and the shifted values are masked at those boundaries.
+
+    Args:
+        df (pd.DataFrame): Long-format data with one value per row.
+        group_cols (list): Columns identifying one observation, e.g. Country Code and Year.
+        order_col (str): Column ordering the vintages within a group.
+        value_col (str): Column holding the values.
+        diff_col (str): Name of the output column with the difference to the previous vintage.
+        pct_col (str): Name of the output column with the percentage change.
+        step_col (str, optional): Column numbering the vintages of a group consecutively.
+            Rows whose step is more than one after the previous row's get no previous
+            value, so a long frame without its missing cells gives the same revisions
+            as the full one.
+
+    Returns:
+        pd.DataFrame: ``df`` sorted by group and vintage, with ``diff_col`` and ``pct_col``
+        added. Rows with a missing group key are dropped, as ``groupby`` would.
+    """
+    df = df.dropna(subset=group_cols).sort_values(by=[*group_cols, order_col])
+
+    # A row starts a new group when any key differs from the previous row
+    new_group = np.ones(len(df), dtype=bool)
+    for col in group_cols:
+        keys = df[col].to_numpy()
+        new_group[1:] &= keys[1:] == keys[:-1]
+    new_group = ~new_group
+    if len(df):
+        new_group[0] = True
+
+    values = df[value_col].to_numpy(dtype="float64")
+    previous = np.empty_like(values)
+    previous[1:] = values[:-1]
+    previous[new_group] = np.nan
+    if step_col is not None:
+        steps = df[step_col].to_numpy()
+        previous[1:][steps[1:] - steps[:-1] > 1] = np.nan
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df[diff_col] = values - previous
+        df[pct_col] = (values / previous - 1) * 100
+
+    return df
+
+
+def revisions_from_wide(df, year_columns, country_col="Country Code", vintage_col="Vintage"):
+    """
+    Compute the revisions of every (country, year) value from wide GFSIBS rows.
+
+    Only the non-missing values are reshaped to long format. The vintages of every
+    country are numbered with a dense rank, so a value missing from an intermediate
+    vintage still breaks the comparison, as it would in the full long frame.
+
+    Args:
+        df (pd.DataFrame): Wide data with one row per country and vintage.
+        year_columns (list): Year columns to compare, labelled e.g. '1990'.
+        country_col (str): Column identifying the country.
+        vintage_col (str): Column holding the vintage, ordered as text.
+
+    Returns:
+        pd.DataFrame: ``country_col``, ``vintage_col`` (as text), 'Year', 'Value',
+        'Difference' and 'Percent_Change' of the values that have a previous vintage.
+    """
+    vintages = df[vintage_col].astype(str)
+    steps = vintages.groupby(df[country_col]).rank(method="dense")
+    pivot_data = wide_to_long(
+        df.assign(**{vintage_col: vintages, "Vintage_Step": steps}),
+        id_vars=[country_col, vintage_col, "Vintage_Step"],
+        year_columns=year_columns
+    )
+    return (
+        pivot_data
+        .pipe(vintage_revisions, group_cols=[country_col, "Year"], order_col=vintage_col, step_col="Vintage_Step")
+        .dropna(subset=["Difference", "Percent_Change"])
+        .drop(columns="Vintage_Step")
+    )
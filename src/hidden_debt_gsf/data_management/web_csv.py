@@ -0,0 +1,377 @@
+"""Typed Parquet cache for the IMF GFSIBS WEB_CSV vintages.
+
+Each ``GFSIBS{year}.csv`` is parsed once into two Parquet files in ``BLD_data``:
+the ``Value`` rows with float64 year columns, and the remaining attribute rows
+(e.g. the cash/accrual flags) with their year columns kept as strings and the
+number of their row in the CSV, so the source row order can be restored. All text
+columns are stored dictionary-encoded and come back as pandas categoricals. The
+SHA-256 of the source CSV and the cache format are written into the Parquet
+metadata, so a cache file is only used while it still matches the CSV it was
+built from.
+
+Most cells of the year matrix are empty, so ingest also stores the ``Value`` rows
+in sparse form: one (Row, Year, Value) triplet per non-missing cell, where Row is
+the position of the row in the values file, and the number of entries of every
+row. Reshapes and coverage queries read these instead of the dense year columns.
+"""
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+
+from hidden_debt_gsf.config import SRC, BLD_data
+
+WEB_CSV_DIR = SRC / "data" / "WEB_CSV"
+PARQUET_DIR = BLD_data / "Parquet" / "WEB_CSV"
+
+WEB_CSV_YEARS = [2014, 2015, 2016, 2017, 2019, 2020, 2024]
+
+# Rows per Parquet row group and per streamed chunk
+CHUNK_SIZE = 100_000
+
+HASH_KEY = b"source_sha256"
+
+# Bump to invalidate the cache files when their layout or parsing changes
+CACHE_FORMAT = b"3"
+FORMAT_KEY = b"cache_format"
+
+# Column of the attributes file holding the row number of every row in the source CSV
+SOURCE_ROW = "Source Row"
+
+
+def csv_path(year, data_dir=WEB_CSV_DIR):
+    """Return the path of the raw WEB_CSV file for a vintage."""
+    return data_dir / f"GFSIBS{year}.csv"
+
+
+def parquet_paths(year):
+    """Return the paths of the Parquet cache files for a vintage."""
+    return {
+        "values": PARQUET_DIR / f"GFSIBS{year}.parquet",
+        "attributes": PARQUET_DIR / f"GFSIBS{year}_attributes.parquet",
+        "entries": PARQUET_DIR / f"GFSIBS{year}_entries.parquet",
+        "coverage": PARQUET_DIR / f"GFSIBS{year}_coverage.parquet",
+    }
+
+
+def is_year_column(col):
+    """Check whether a WEB_CSV column holds the observations of one year."""
+    return str(col).isdigit() and len(str(col)) == 4
+
+
+def file_hash(path):
+    """
+    Return the SHA-256 of a file.
+
+    The digest is memoized on (path, size, mtime) so repeated cache lookups
+    within one build hash every source file only once.
+    """
+    stat = path.stat()
+    return _file_hash(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=None)
+def _file_hash(path, size, mtime_ns):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def to_float64(column):
+    """
+    Parse a column of numbers as float64, with non-numeric entries as NaN.
+
+    ``pd.to_numeric`` uses pandas' fast float parser, which can be one ULP off for
+    values with 17 significant digits, so the entries it accepts are parsed again
+    exactly. Numeric columns are expected to be read with ``float_precision="round_trip"``.
+    """
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype("float64")
+    parsed = pd.to_numeric(column, errors="coerce").astype("float64")
+    is_number = parsed.notna()
+    parsed[is_number] = column[is_number].astype(str).astype("float64")
+    return parsed
+
+
+def split_attributes(data):
+    """
+    Split a raw vintage into typed ``Value`` rows and string attribute rows.
+
+    Text columns become categoricals sharing the same categories in both parts,
+    year columns of the ``Value`` rows become float64.
+
+    Returns:
+        tuple: (values, attributes) DataFrames. The values are renumbered from 0, the
+        attributes keep the index of ``data``, i.e. their row in the source.
+    """
+    year_columns = [col for col in data.columns if is_year_column(col)]
+    text_columns = [
+        col for col in data.columns
+        if col not in year_columns and data[col].dtype == "object"
+    ]
+    data = data.astype({col: "category" for col in text_columns})
+
+    is_value = data["Attribute"] == "Value"
+    values = data[is_value].copy()
+    values[year_columns] = values[year_columns].apply(to_float64)
+    attributes = data[~is_value].copy()
+    attributes[year_columns] = attributes[year_columns].astype("string")
+    return values.reset_index(drop=True), attributes
+
+
+def sparse_entries(values):
+    """
+    Convert the year columns of ``Value`` rows into (row, year, value) triplets.
+
+    Args:
+        values (pd.DataFrame): ``Value`` rows with float64 year columns, as returned
+            by ``split_attributes``.
+
+    Returns:
+        tuple: (DataFrame with the columns 'Row', 'Year' and 'Value', one row per
+        non-missing cell ordered by row and year, DataFrame with the 'Entry Count'
+        of every row of ``values``).
+    """
+    year_columns = [col for col in values.columns if is_year_column(col)]
+    block = values[year_columns].to_numpy(dtype="float64", na_value=np.nan)
+    present = ~np.isnan(block)
+    row_idx, year_idx = np.nonzero(present)
+
+    entries = pd.DataFrame({
+        "Row": row_idx.astype("int32"),
+        "Year": np.asarray([int(col) for col in year_columns], dtype="int16")[year_idx],
+        "Value": block[row_idx, year_idx],
+    })
+    coverage = pd.DataFrame({"Entry Count": present.sum(axis=1).astype("int16")})
+    return entries, coverage
+
+
+def write_gfsibs_cache(source, produces):
+    """
+    Convert one WEB_CSV vintage into its Parquet cache files.
+
+    Args:
+        source (Path): Path to the ``GFSIBS{year}.csv`` file.
+        produces (dict): Paths as returned by ``parquet_paths``.
+    """
+    source_hash = file_hash(source)
+    values, attributes = split_attributes(pd.read_csv(source, low_memory=False, float_precision="round_trip"))
+    entries, coverage = sparse_entries(values)
+    attributes = attributes.assign(**{SOURCE_ROW: attributes.index.to_numpy(dtype="int64")})
+
+    parts = {"values": values, "attributes": attributes, "entries": entries, "coverage": coverage}
+    for key, frame in parts.items():
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        metadata = {**(table.schema.metadata or {}), HASH_KEY: source_hash.encode(), FORMAT_KEY: CACHE_FORMAT}
+        produces[key].parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table.replace_schema_metadata(metadata), produces[key], row_group_size=CHUNK_SIZE)
+    print(f"Cached {source.name} as Parquet ({len(values)} value rows, {len(attributes)} attribute rows, "
+          f"{len(entries)} value entries)")
+
+
+def is_cache_fresh(year, data_dir=WEB_CSV_DIR):
+    """Check whether all cache files of a vintage (see ``parquet_paths``) exist and match the source CSV and cache format."""
+    source = csv_path(year, data_dir)
+    paths = parquet_paths(year).values()
+    if not source.exists() or not all(path.exists() for path in paths):
+        return False
+    expected = {HASH_KEY: file_hash(source).encode(), FORMAT_KEY: CACHE_FORMAT}
+    for path in paths:
+        metadata = pq.read_schema(path).metadata or {}
+        if any(metadata.get(key) != value for key, value in expected.items()):
+            return False
+    return True
+
+
+def gfsibs_columns(year, data_dir=WEB_CSV_DIR):
+    """Return the column names of a vintage without loading any rows."""
+    if is_cache_fresh(year, data_dir):
+        return pq.read_schema(parquet_paths(year)["values"]).names
+    return list(pd.read_csv(csv_path(year, data_dir), nrows=0).columns)
+
+
+def concat_categorical(frames):
+    """Concatenate frames, unifying categories first so categoricals survive."""
+    frames = [frame for frame in frames if not frame.empty] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].select_dtypes("category").columns:
+        if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = union_categoricals(
+                [frame[col] for frame in frames], ignore_order=True
+            ).categories
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_gfsibs_sparse(year, columns=None, data_dir=WEB_CSV_DIR):
+    """
+    Load a WEB_CSV vintage with the year matrix of its ``Value`` rows in sparse form.
+
+    Prefers the Parquet cache; otherwise the CSV is parsed once and converted with
+    ``sparse_entries``.
+
+    Args:
+        year (int or str): Vintage to load.
+        columns (list, optional): Non-year columns to read. Reads all columns if None.
+        data_dir (Path): Directory holding the raw ``GFSIBS{year}.csv`` files.
+
+    Returns:
+        tuple: (the ``Value`` rows followed by the attribute rows, where only the
+        attribute rows carry year columns and the index of a ``Value`` row is its
+        'Row' in the entries; the (Row, Year, Value) entries; the 'Entry Count' of
+        every ``Value`` row).
+    """
+    if is_cache_fresh(year, data_dir):
+        paths = parquet_paths(year)
+        year_columns = [col for col in pq.read_schema(paths["attributes"]).names if is_year_column(col)]
+        if columns is None:
+            columns = [col for col in pq.read_schema(paths["values"]).names if not is_year_column(col)]
+        values = pq.read_table(paths["values"], columns=columns).to_pandas()
+        attributes = pq.read_table(paths["attributes"], columns=[*columns, *year_columns]).to_pandas()
+        entries = pq.read_table(paths["entries"]).to_pandas()
+        coverage = pq.read_table(paths["coverage"]).to_pandas()
+    else:
+        source = csv_path(year, data_dir)
+        print(f"Parquet cache missing or stale for {year}, parsing {source}")
+        if columns is not None:
+            year_columns = [col for col in gfsibs_columns(year, data_dir) if is_year_column(col)]
+            usecols = [*columns, *year_columns, *(["Attribute"] if "Attribute" not in columns else [])]
+        else:
+            usecols = None
+        values, attributes = split_attributes(pd.read_csv(source, usecols=usecols, low_memory=False, float_precision="round_trip"))
+        entries, coverage = sparse_entries(values)
+        year_columns = [col for col in values.columns if is_year_column(col)]
+        if columns is None:
+            columns = [col for col in values.columns if col not in year_columns]
+        values = values[columns]
+        attributes = attributes[[*columns, *year_columns]]
+
+    return concat_categorical([values, attributes]), entries, coverage
+
+
+def read_coverage(year, columns, data_dir=WEB_CSV_DIR):
+    """
+    Load the ``Value`` rows of a vintage with their precomputed number of year entries.
+
+    Args:
+        year (int or str): Vintage to load.
+        columns (list): Non-year columns to read.
+        data_dir (Path): Directory holding the raw ``GFSIBS{year}.csv`` files.
+
+    Returns:
+        pd.DataFrame: The ``Value`` rows with ``columns`` and 'Entry Count', without
+        reading any year column from the cache.
+    """
+    if is_cache_fresh(year, data_dir):
+        paths = parquet_paths(year)
+        values = pq.read_table(paths["values"], columns=columns).to_pandas()
+        coverage = pq.read_table(paths["coverage"]).to_pandas()
+    else:
+        source = csv_path(year, data_dir)
+        print(f"Parquet cache missing or stale for {year}, parsing {source}")
+        year_columns = [col for col in gfsibs_columns(year, data_dir) if is_year_column(col)]
+        usecols = [*columns, *year_columns, *(["Attribute"] if "Attribute" not in columns else [])]
+        values, _ = split_attributes(pd.read_csv(source, usecols=usecols, low_memory=False, float_precision="round_trip"))
+        _, coverage = sparse_entries(values)
+        values = values[columns]
+
+    return values.assign(**{"Entry Count": coverage["Entry Count"].to_numpy()})
+
+
+def iter_gfsibs(year, chunksize=CHUNK_SIZE, columns=None, data_dir=WEB_CSV_DIR):
+    """
+    Stream a WEB_CSV vintage in chunks of at most ``chunksize`` rows.
+
+    Reads record batches from the Parquet cache when it is fresh, otherwise streams
+    the raw CSV, so that only one chunk of the vintage is held in memory at a time.
+    Every chunk is indexed by the row numbers of its rows in the source CSV. From the
+    cache, all ``Value`` rows come before the attribute rows, so ``sort_index``
+    restores the source order of the collected rows.
+
+    Args:
+        year (int or str): Vintage to load.
+        chunksize (int): Maximum number of rows per chunk.
+        columns (list, optional): Columns to read. Reads all columns if None.
+        data_dir (Path): Directory holding the raw ``GFSIBS{year}.csv`` files.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the vintage.
+    """
+    if is_cache_fresh(year, data_dir):
+        paths = parquet_paths(year)
+        if columns is None:
+            columns = pq.read_schema(paths["values"]).names
+
+        # Attribute j sits in front of the Value row numbered A[j] - j, which places every Value row
+        source_rows = pq.read_table(paths["attributes"], columns=[SOURCE_ROW]).column(0).to_numpy()
+        value_slots = source_rows - np.arange(len(source_rows))
+
+        start = 0
+        for batch in pq.ParquetFile(paths["values"]).iter_batches(batch_size=chunksize, columns=columns):
+            rows = np.arange(start, start + batch.num_rows)
+            start += batch.num_rows
+            yield batch.to_pandas().set_axis(rows + np.searchsorted(value_slots, rows, side="right"))
+
+        attributes = pq.ParquetFile(paths["attributes"])
+        for batch in attributes.iter_batches(batch_size=chunksize, columns=[*columns, SOURCE_ROW]):
+            yield batch.to_pandas().set_index(SOURCE_ROW).rename_axis(None)
+    else:
+        print(f"Parquet cache missing or stale for {year}, streaming {csv_path(year, data_dir)}")
+        reader = pd.read_csv(
+            csv_path(year, data_dir), chunksize=chunksize, usecols=columns, low_memory=False,
+            float_precision="round_trip"
+        )
+        with reader:
+            yield from reader
+
+
+def filter_keywords(data, column_name, keywords, label=None):
+    """
+    Keep the rows whose ``column_name`` contains any of the keywords (case-insensitive).
+
+    The keywords are only matched against the distinct values of the column, and the rows
+    are selected with a single boolean mask. Rows come back in keyword order, i.e. all
+    rows matching the first keyword, then the remaining rows matching the second, etc.
+
+    Args:
+        data (pd.DataFrame): Data to filter.
+        column_name (str): Column to search for the keywords.
+        keywords (list): Keywords, interpreted as in ``Series.str.contains``.
+        label (str, optional): If given, every row is returned once per matching keyword,
+            with that keyword stored in a column of this name.
+
+    Returns:
+        pd.DataFrame: The matching rows.
+    """
+    column = data[column_name]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        values = pd.Series(column.cat.categories, dtype=object)
+    else:
+        values = pd.Series(column.dropna().unique(), dtype=object)
+
+    # Keyword matches per distinct value, in keyword order
+    matches = pd.DataFrame({
+        keyword: values.astype(str).str.contains(keyword, case=False, na=False).to_numpy()
+        for keyword in keywords
+    }, index=values)
+    matches = matches[matches.any(axis=1)]
+
+    rows = data[column.isin(matches.index)]
+    if label is None:
+        first_keyword = matches.to_numpy().argmax(axis=1)
+        order = rows[column_name].map(pd.Series(first_keyword, index=matches.index))
+        return rows.iloc[order.to_numpy().argsort(kind="stable")]
+
+    # One entry per (value, keyword) pair, expanded only for the selected rows
+    keyword_lists = matches.apply(lambda row: [k for k in keywords if row[k]], axis=1)
+    labelled = rows.assign(**{label: rows[column_name].astype(object).map(keyword_lists)}).explode(label)
+    order = labelled[label].map({keyword: i for i, keyword in enumerate(keywords)})
+    return labelled.iloc[order.to_numpy().argsort(kind="stable")]
@@ -0,0 +1,85 @@
+"""Reshape of wide GFS year blocks into long format without the empty cells."""
+import numpy as np
+import pandas as pd
+
+
+def wide_to_long(df, id_vars, year_columns, var_name="Year", value_name="Value", dtype="float64", dropna=True):
+    """
+    Reshape the year columns of a wide frame into one row per (row, year) cell.
+
+    Equivalent to ``df.melt(id_vars, year_columns, var_name, value_name)`` followed by
+    ``pd.to_numeric(errors='coerce')`` on the values, ``astype(int)`` on the year labels
+    and ``dropna(subset=[value_name])``, with the rows in the same (year-major) order.
+    The year columns are read as one 2-D block and only its non-missing cells are
+    gathered, so the empty cells that dominate the GFS matrices are never materialized
+    in long format.
+
+    Args:
+        df (pd.DataFrame): Wide data with one column per year, labelled e.g. '1990'.
+        id_vars (list): Columns repeated on every long row.
+        year_columns (list): Year columns to reshape.
+        var_name (str): Name of the integer year column.
+        value_name (str): Name of the value column.
+        dtype (str, optional): Dtype of the values; non-numeric entries become NaN.
+            With None the values keep their dtype, e.g. for text flags.
+        dropna (bool): Drop the missing cells. With False every cell is kept, as melt does.
+
+    Returns:
+        pd.DataFrame: The long frame with ``id_vars``, ``var_name`` and ``value_name``
+        and a fresh RangeIndex.
+    """
+    year_columns = list(year_columns)
+    block = df[year_columns]
+    if dtype is not None:
+        text_columns = [col for col in year_columns if not pd.api.types.is_numeric_dtype(block[col])]
+        if text_columns:
+            block = block.assign(**{col: pd.to_numeric(block[col], errors="coerce") for col in text_columns})
+        values = block.to_numpy(dtype=dtype, na_value=np.nan)
+    else:
+        values = block.to_numpy()
+
+    # Transposed, so that the cells come out year by year as with melt
+    if dropna:
+        year_idx, row_idx = np.nonzero(~pd.isna(values.T))
+    else:
+        year_idx, row_idx = np.divmod(np.arange(values.size), len(df))
+
+    long_df = df[list(id_vars)].take(row_idx).reset_index(drop=True)
+    long_df[var_name] = np.asarray([int(col) for col in year_columns], dtype="int64")[year_idx]
+    long_df[value_name] = values[row_idx, year_idx]
+    return long_df
+
+
+def entries_to_long(df, id_vars, entries, var_name="Year", value_name="Value", years=None):
+    """
+    Build the long frame of ``wide_to_long`` from sparse (Row, Year, Value) entries.
+
+    The index of ``df`` holds the 'Row' of every row in ``entries`` (see
+    ``read_gfsibs_sparse``), so only the entries of the rows in ``df`` are gathered and
+    no year block is read at all. The result equals ``wide_to_long`` on the dense
+    frame, in the same (year-major) order.
+
+    Args:
+        df (pd.DataFrame): Rows to reshape, indexed by their Row.
+        id_vars (list): Columns repeated on every long row.
+        entries (pd.DataFrame): Sparse entries with the columns 'Row', 'Year' and 'Value'.
+        var_name (str): Name of the integer year column.
+        value_name (str): Name of the value column.
+        years (tuple, optional): Inclusive (first, last) year range to keep.
+
+    Returns:
+        pd.DataFrame: The long frame with ``id_vars``, ``var_name`` and ``value_name``
+        and a fresh RangeIndex.
+    """
+    position = pd.Index(df.index).get_indexer(entries["Row"])
+    selected = position >= 0
+    if years is not None:
+        selected &= entries["Year"].between(*years).to_numpy()
+    position = position[selected]
+    entry_years = entries["Year"].to_numpy()[selected].astype("int64")
+
+    order = np.lexsort((position, entry_years))
+    long_df = df[list(id_vars)].take(position[order]).reset_index(drop=True)
+    long_df[var_name] = entry_years[order]
+    long_df[value_name] = entries["Value"].to_numpy(dtype="float64")[selected][order]
+    return long_df
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from hidden_debt_gsf.data_management.coverage_index import index_coverage, summarize_coverage, unpack_countries
+
+
+def make_rows():
+    return pd.DataFrame({
+        "Country Code": [111, 111, 174, 174, 132],
+        "Stocks, Transactions, and Other Flows Name": ["Debt", "Debt", "Debt", "Revenue", np.nan],
+        "Sector Name": ["General government"] * 5,
+        "Unit Name": ["Domestic currency"] * 5,
+        "Residence Name": ["Total"] * 5,
+        "Instrument and Assets Classification Name": ["Total"] * 5,
+        "Entry Count": [3, 2, 4, 5, 7],
+    })
+
+
+def test_index_coverage_counts_entries_and_countries():
+    index = index_coverage(make_rows())
+
+    assert index["Stocks, Transactions, and Other Flows Name"].tolist() == ["Debt", "Revenue"]
+    assert index["Entries"].tolist() == [9, 5]
+    assert index["Number of Countries"].tolist() == [2, 1]
+    assert unpack_countries(index["Countries"].iloc[0]).tolist() == [111, 174]
+    assert unpack_countries(index["Countries"].iloc[1]).tolist() == [174]
+
+
+def test_index_coverage_skips_rows_with_missing_key():
+    rows = make_rows()
+    rows.loc[0, "Sector Name"] = np.nan
+
+    index = index_coverage(rows)
+
+    assert index["Entries"].tolist() == [6, 5]
+    assert index["Number of Countries"].tolist() == [2, 1]
+
+
+def test_summarize_coverage_counts_entries_once_per_keyword():
+    rows = make_rows()
+    rows["Stocks, Transactions, and Other Flows Name"] = ["Debt liabilities"] * 3 + ["Revenue", np.nan]
+
+    summary = summarize_coverage(index_coverage(rows), ["debt", "liabilities"])
+
+    assert summary["Sum of Legitimate Entries"].tolist() == [18]
+    assert summary["Number of Covered Countries"].tolist() == [2]
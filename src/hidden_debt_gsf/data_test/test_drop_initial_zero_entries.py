@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from hidden_debt_gsf.data_management.outliers import drop_initial_zero_entries
+
+
+def test_drop_initial_zero_entries_drops_leading_zero_before_nonzero():
+    combined_data = pd.DataFrame({
+        "Country Code": [111, 111, 111, 174, 174, 174],
+        "Year": [2000, 2000, 2000, 2000, 2000, 2000],
+        "Vintage": [2014, 2015, 2016, 2014, 2015, 2016],
+        "Residence Name": ["total", "total", "total", "total", "total", "total"],
+        "Value": [0.0, 5.0, 6.0, 0.0, 0.0, 3.0],
+    })
+
+    result = drop_initial_zero_entries(combined_data)
+
+    # Only the first zero of country 111 is followed by a non-zero value
+    assert result.index.tolist() == [1, 2, 3, 4, 5]
+
+
+def test_drop_initial_zero_entries_treats_missing_next_value_as_nonzero():
+    combined_data = pd.DataFrame({
+        "Country Code": [111, 111, 174],
+        "Year": [2000, 2000, 2000],
+        "Vintage": [2014, 2015, 2014],
+        "Residence Name": ["domestic", "domestic", "foreign"],
+        "Value": [0.0, np.nan, 0.0],
+    })
+
+    result = drop_initial_zero_entries(combined_data)
+
+    # A single-row group keeps its zero
+    assert result.index.tolist() == [1, 2]
+
+
+def test_drop_initial_zero_entries_without_drops_keeps_order():
+    combined_data = pd.DataFrame({
+        "Country Code": [174, 111, 174, 111],
+        "Year": [2000, 2000, 2000, 2000],
+        "Vintage": [2014, 2014, 2015, 2015],
+        "Residence Name": ["total", "total", "total", np.nan],
+        "Value": [1.0, 0.0, 2.0, 3.0],
+    })
+
+    result = drop_initial_zero_entries(combined_data)
+
+    # Rows with a missing group key are dropped, the others stay in their order
+    assert result.index.tolist() == [0, 1, 2]
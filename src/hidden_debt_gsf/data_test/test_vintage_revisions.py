@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from hidden_debt_gsf.data_management.vintage_revisions import revisions_from_wide, vintage_revisions
+
+
+def test_vintage_revisions_compares_consecutive_vintages_per_group():
+    pivot_data = pd.DataFrame({
+        "Country Code": [111, 111, 111, 174, 174],
+        "Year": [2000, 2000, 2000, 2000, 2000],
+        "Vintage": ["2016", "2014", "2015", "2015", "2014"],
+        "Value": [120.0, 100.0, 110.0, 50.0, 40.0],
+    })
+
+    revisions = vintage_revisions(pivot_data, group_cols=["Country Code", "Year"])
+
+    assert revisions["Vintage"].tolist() == ["2014", "2015", "2016", "2014", "2015"]
+    np.testing.assert_allclose(revisions["Difference"], [np.nan, 10.0, 10.0, np.nan, 10.0])
+    np.testing.assert_allclose(revisions["Percent_Change"], [np.nan, 10.0, 100 / 11, np.nan, 25.0])
+
+
+def test_vintage_revisions_handles_gaps_zeros_and_missing_keys():
+    pivot_data = pd.DataFrame({
+        "Country Code": [111, 111, 111, 111, np.nan],
+        "Year": [2000, 2000, 2000, 2000, 2000],
+        "Vintage": ["2014", "2015", "2016", "2017", "2014"],
+        "Value": [0.0, 5.0, np.nan, 7.0, 1.0],
+    })
+
+    revisions = vintage_revisions(pivot_data, group_cols=["Country Code", "Year"])
+
+    assert revisions.index.tolist() == [0, 1, 2, 3]
+    np.testing.assert_allclose(revisions["Difference"], [np.nan, 5.0, np.nan, np.nan])
+    np.testing.assert_allclose(revisions["Percent_Change"], [np.nan, np.inf, np.nan, np.nan])
+
+
+def test_vintage_revisions_skips_missing_vintage_steps():
+    # Long frame without its missing cells: vintage step 3 of the group has no value
+    pivot_data = pd.DataFrame({
+        "Country Code": [111, 111, 111],
+        "Year": [2000, 2000, 2000],
+        "Vintage": ["2014", "2015", "2017"],
+        "Vintage_Step": [1, 2, 4],
+        "Value": [100.0, 110.0, 130.0],
+    })
+
+    revisions = vintage_revisions(pivot_data, group_cols=["Country Code", "Year"], step_col="Vintage_Step")
+    consecutive = vintage_revisions(pivot_data, group_cols=["Country Code", "Year"])
+
+    np.testing.assert_allclose(revisions["Difference"], [np.nan, 10.0, np.nan])
+    np.testing.assert_allclose(revisions["Percent_Change"], [np.nan, 10.0, np.nan])
+    np.testing.assert_allclose(consecutive["Difference"], [np.nan, 10.0, 20.0])
+
+
+def test_revisions_from_wide_breaks_comparison_at_missing_values():
+    wide = pd.DataFrame({
+        "Country Code": [111, 111, 111, 174],
+        "Vintage": [2014, 2015, 2016, 2014],
+        "2000": [100.0, np.nan, 130.0, 40.0],
+        "2001": [200.0, 210.0, 220.0, np.nan],
+    })
+
+    revisions = revisions_from_wide(wide, ["2000", "2001"])
+
+    # 2000 of country 111 has no 2015 value, so 2016 is not compared with 2014
+    assert revisions.columns.tolist() == ["Country Code", "Vintage", "Year", "Value", "Difference", "Percent_Change"]
+    assert revisions["Vintage"].tolist() == ["2015", "2016"]
+    assert revisions["Year"].tolist() == [2001, 2001]
+    np.testing.assert_allclose(revisions["Difference"], [10.0, 10.0])
@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+from hidden_debt_gsf.data_management.web_csv import to_float64
+
+
+def test_to_float64_parses_text_exactly():
+    column = pd.Series(["463.42857142857144", "C", "", None, "12"], dtype=object)
+
+    parsed = to_float64(column)
+
+    assert parsed.iloc[0] == float("463.42857142857144")
+    assert parsed.iloc[4] == 12.0
+    assert parsed.iloc[1:4].isna().all()
+    assert parsed.dtype == np.float64
@@ -0,0 +1,132 @@
+"""Per-country vintage bar charts for the merged indicators.
+
+The panel of an indicator is grouped once by country and debt type, and every group
+becomes one grouped bar chart of its values by year and vintage. Charts are returned
+as figure specs, so a task renders all countries in one batch with render_figures.
+"""
+import re
+
+import pandas as pd
+import plotly.express as px
+from hidden_debt_gsf.config import BLD_figures
+from hidden_debt_gsf.data_management.merge_indicators import DEBT_TYPES
+from hidden_debt_gsf.data_management.panel_store import get_country, read_panel
+from hidden_debt_gsf.final.plot.rendering import figure_spec
+
+COUNTRY_FIGURES_DIR = BLD_figures / "Countries"
+
+# Country Codes plotted by the plot tasks, e.g. [174] for Greece only (None = all countries)
+REPORT_COUNTRIES = None
+
+# Indicator -> title, output folder and file name suffix of its charts
+REPORT_INDICATORS = {
+    "debt_stock": {
+        "title": "Debt Stock",
+        "folder": "Debt_Stock",
+        "suffix": "debt_stock",
+    },
+    "net_incurrence": {
+        "title": "Net Incurrence of Liabilities",
+        "folder": "Net_Incurrence",
+        "suffix": "net_incurrence_liabilities",
+    },
+}
+
+REPORT_COLUMNS = ["Country Code", "Country Name", "Residence Name", "Year", "Vintage", "Value"]
+
+
+def country_slug(name):
+    """Turn a country name into a file name prefix, e.g. 'Korea, Republic of' -> 'korea_republic_of'."""
+    return re.sub(r"[^0-9a-z]+", "_", str(name).lower()).strip("_")
+
+
+def load_report_panel(indicator, countries=None):
+    """
+    Load the columns of an indicator's panel store needed for the country charts.
+
+    Args:
+        indicator (str): Indicator name, a key of REPORT_INDICATORS.
+        countries (list, optional): Country Codes to load; only their row groups are
+            read. All countries are loaded if None.
+
+    Returns:
+        pd.DataFrame: Panel rows of the requested countries.
+    """
+    if countries is None:
+        return read_panel(indicator, columns=REPORT_COLUMNS)
+    frames = [get_country(code, indicator)[REPORT_COLUMNS] for code in countries]
+    return pd.concat(frames, ignore_index=True)
+
+
+def plot_country_vintages(country_data, country, debt_type, indicator, output_folder):
+    """
+    Create a grouped bar chart of one country's Value by Year and Vintage for one debt type.
+
+    Parameters:
+        country_data (pd.DataFrame): Panel rows of the country and debt type.
+        country (str): Country name used for labeling and the file name.
+        debt_type (str): Debt type (e.g., 'total', 'domestic', or 'foreign') used for labeling.
+        indicator (str): Indicator name, a key of REPORT_INDICATORS.
+        output_folder (Path): Directory in which to save the HTML file.
+
+    Returns:
+        dict: Figure spec of the chart, to be rendered with render_figures.
+    """
+    labels = REPORT_INDICATORS[indicator]
+
+    # Year and Vintage as strings for a categorical display
+    country_data = country_data.assign(
+        Year=country_data["Year"].astype(str),
+        Vintage=country_data["Vintage"].astype(str),
+    )
+
+    fig = px.bar(
+        country_data,
+        x="Year",
+        y="Value",
+        color="Vintage",
+        barmode="group",
+        title=f"{country}: {labels['title']} by Year and Vintage ({debt_type})"
+    )
+    fig.update_layout(
+        xaxis_title="Year",
+        yaxis_title="Value",
+        legend_title="Vintage"
+    )
+
+    output_path = output_folder / f"{country_slug(country)}_{debt_type}_{labels['suffix']}.html"
+    return figure_spec(fig, output_path)
+
+
+def country_vintage_specs(panel, indicator, countries=None, debt_types=DEBT_TYPES, output_dir=COUNTRY_FIGURES_DIR):
+    """
+    Create the vintage bar charts of every country and debt type in one pass over the panel.
+
+    Args:
+        panel (pd.DataFrame): Panel of the indicator with the REPORT_COLUMNS.
+        indicator (str): Indicator name, a key of REPORT_INDICATORS.
+        countries (list, optional): Country Codes to plot. All countries if None.
+        debt_types (list): Debt types to plot.
+        output_dir (Path): Base directory; the charts of a country are written to
+            ``output_dir / <country> / <indicator folder>``.
+
+    Returns:
+        list: Figure specs of the charts, ordered by Country Code and debt type.
+    """
+    panel = panel[panel["Residence Name"].isin(debt_types)]
+    if countries is not None:
+        panel = panel[panel["Country Code"].isin(countries)]
+
+    specs = []
+    for code, country_panel in panel.groupby("Country Code", sort=True, observed=True):
+        names = country_panel["Country Name"].dropna()
+        country = names.iloc[0] if len(names) else str(code)
+        output_folder = output_dir / country_slug(country) / REPORT_INDICATORS[indicator]["folder"]
+
+        by_type = dict(tuple(country_panel.groupby("Residence Name", sort=False, observed=True)))
+        for debt_type in debt_types:
+            if debt_type in by_type:
+                specs.append(plot_country_vintages(by_type[debt_type], country, debt_type, indicator, output_folder))
+
+    print(f"Prepared {len(specs)} {indicator} country charts")
+    return specs
@@ -0,0 +1,91 @@
+"""Batched rendering of Plotly figures to HTML.
+
+The plot tasks build their figures and hand them over as figure specs, pairs of the
+figure's dict and its output path. ``render_figures`` writes a batch of specs, on a
+process pool when more than one worker is requested. Instead of embedding the
+plotly.js bundle (several MB) into every file, each HTML file references one shared
+local copy of plotly.js in BLD_figures through a relative path, so the figures work
+offline. The bundle is produced once by task_write_plotly_js; its file name carries
+the plotly version, so an upgrade writes a new bundle and re-renders the figures.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import plotly
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+from hidden_debt_gsf.config import BLD_figures, N_WORKERS
+
+PLOTLY_JS = BLD_figures / f"plotly-{plotly.__version__}.min.js"
+
+
+def figure_spec(fig, output_path):
+    """
+    Describe a figure to be rendered by ``render_figures``.
+
+    Args:
+        fig (plotly.graph_objects.Figure or dict): The figure.
+        output_path (Path): Path of the HTML file.
+
+    Returns:
+        dict: The figure as a plain dict, which is cheap to send to a worker process,
+        and its output path.
+    """
+    figure = fig if isinstance(fig, dict) else fig.to_dict()
+    return {"figure": figure, "path": Path(output_path)}
+
+
+def write_plotly_js(plotly_js=PLOTLY_JS):
+    """Write the plotly.js bundle of the installed plotly version to ``plotly_js`` unless it already holds it."""
+    bundle = get_plotlyjs().encode("utf-8")
+    plotly_js = Path(plotly_js)
+    if plotly_js.exists() and hashlib.sha256(plotly_js.read_bytes()).digest() == hashlib.sha256(bundle).digest():
+        return plotly_js
+    plotly_js.parent.mkdir(parents=True, exist_ok=True)
+    plotly_js.write_bytes(bundle)
+    return plotly_js
+
+
+def render_figure(spec, plotly_js=PLOTLY_JS):
+    """
+    Write one figure spec as an HTML file referencing the shared plotly.js bundle.
+
+    Returns:
+        Path: The written HTML file.
+    """
+    output_path = spec["path"]
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Script src relative to the HTML file, so the figure folder can be moved as a whole
+    src = Path(os.path.relpath(plotly_js, output_path.parent)).as_posix()
+    pio.write_html(spec["figure"], output_path, include_plotlyjs=src)
+    return output_path
+
+
+def render_figures(specs, n_workers=N_WORKERS, plotly_js=PLOTLY_JS):
+    """
+    Render a batch of figure specs to HTML.
+
+    The figures are independent, so with ``n_workers > 1`` they are written on a process
+    pool. The shared plotly.js bundle is not written here; tasks rendering figures
+    depend on PLOTLY_JS, which task_write_plotly_js produces.
+
+    Args:
+        specs (list): Figure specs as returned by ``figure_spec``.
+        n_workers (int): Worker processes (1 = sequential).
+        plotly_js (Path): Location of the shared plotly.js bundle.
+
+    Returns:
+        list: The written HTML files, in the order of ``specs``.
+    """
+    specs = list(specs)
+
+    if n_workers > 1 and len(specs) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(specs))) as executor:
+            paths = list(executor.map(render_figure, specs, [plotly_js] * len(specs)))
+    else:
+        paths = [render_figure(spec, plotly_js) for spec in specs]
+
+    print(f"Rendered {len(paths)} figures referencing {plotly_js}")
+    return paths
@@ -1,17 +1,22 @@
-import pandas as pd
 from pathlib import Path
 import plotly.express as px
-from hidden_debt_gsf.config import SRC, BLD_data, BLD_figures
+from hidden_debt_gsf.config import SRC, BLD_figures
+from hidden_debt_gsf.data_management.panel_store import read_panel, store_path
+from hidden_debt_gsf.final.plot.country_reports import REPORT_COUNTRIES, country_vintage_specs, load_report_panel
+from hidden_debt_gsf.final.plot.rendering import PLOTLY_JS, figure_spec, render_figures
 
 def plot_vintage_diff_histogram(merged_vintage, debt_type="total", cap=10, output_folder= Path("hist")):
     """
-    Create and display a histogram of percentage changes between consecutive vintages using Plotly.
+    Create a histogram of percentage changes between consecutive vintages using Plotly.
 
     Parameters:
         merged_vintage (pd.DataFrame): DataFrame containing vintage differences.
             Must include the column 'Value_Diff_Perc' representing the percent change from the previous vintage.
         debt_type (str): Debt type used for labeling in the title.
         cap (int): Cap for outlier filtering on both sides.
+
+    Returns:
+        dict: Figure spec of the histogram, to be rendered with render_figures.
     """
     # Drop NaNs from the percent change column
     percent_changes = merged_vintage['Value_Diff_Perc'].dropna()
@@ -53,64 +58,26 @@ def plot_vintage_diff_histogram(merged_vintage, debt_type="total", cap=10, outpu
         xaxis_range=[-cap, cap]
     )
     output_path = output_folder / f"hist_debt_stock_diff_{debt_type}.html"
-    fig.write_html(output_path)
-
-def plot_greece_debt_stock(combined_data, debt_type, output_folder=Path("greece/debt_stock")):
-    """
-    Filter the combined data for Greece and create a grouped bar chart for Value by Year and Vintage.
-    The plot is saved as an HTML file in the specified output folder.
-    
-    Parameters:
-        combined_data (pd.DataFrame): DataFrame containing the combined dataset for all debt types.
-        debt_type (str): Debt type (e.g., 'total', 'domestic', or 'foreign') used for labeling.
-        output_folder (str): Directory in which to save the HTML file.
-    """
-    # Ensure the output directory exists.
-    output_folder.mkdir(parents=True, exist_ok=True)
-    
-    # Filter for Greece (Country Code 174)
-    greece_data = combined_data[combined_data['Country Code'] == 174].copy()
-    
-    # Convert Year and Vintage to string for proper categorical display.
-    greece_data['Year'] = greece_data['Year'].astype(str)
-    greece_data['Vintage'] = greece_data['Vintage'].astype(str)
-    
-    # Create a grouped bar chart with Year on the x-axis, Value on the y-axis, grouped by Vintage.
-    fig = px.bar(
-        greece_data,
-        x="Year",
-        y="Value",
-        color="Vintage",
-        barmode="group",
-        title=f"Greece: Debt Stock by Year and Vintage ({debt_type})"
-    )
-    
-    # Customize the layout.
-    fig.update_layout(
-        xaxis_title="Year",
-        yaxis_title="Value",
-        legend_title="Vintage"
-    )
-    
-    # Build the output file path.
-    output_path = output_folder / f"greece_{debt_type}_debt_stock.html"
-    fig.write_html(output_path)
+    return figure_spec(fig, output_path)
 
 def task_plot_debt_stock(
-        depends_on=BLD_data / "Merged" / "all_types_debt_stock.csv"
+        depends_on=store_path("debt_stock"),
+        plotly_js=PLOTLY_JS
 ):
-    combined_data = pd.read_csv(depends_on)
+    # The histograms only need the percentage changes of the whole panel
+    combined_data = read_panel("debt_stock", columns=["Value_Diff_Perc"])
     # Define the debt types to process.
     debt_types = ["total", "domestic", "foreign"]
 
-    output_folder_greece=BLD_figures / "Greece" / "Debt_Stock"
-    output_folder_greece.mkdir(parents=True, exist_ok=True)
     output_folder_hist= BLD_figures / "Merged" / "Debt_Stock"
     output_folder_hist.mkdir(parents=True, exist_ok=True)
     
+    # Vintage bar charts of every country, from one pass over the panel
+    specs = country_vintage_specs(load_report_panel("debt_stock", REPORT_COUNTRIES), "debt_stock", REPORT_COUNTRIES, debt_types)
+
     for dt in debt_types:
-        #  Plot the debt stock for Greece.
-        plot_greece_debt_stock(combined_data=combined_data, debt_type=dt, output_folder=output_folder_greece)
-                
         # Plot the vintage differences histogram.
-        plot_vintage_diff_histogram(merged_vintage=combined_data, debt_type=dt, cap=10, output_folder= output_folder_hist)
+        specs.append(plot_vintage_diff_histogram(merged_vintage=combined_data, debt_type=dt, cap=10, output_folder= output_folder_hist))
+
+    # Write all figures at once, sharing one plotly.js bundle
+    render_figures(specs, plotly_js=plotly_js)
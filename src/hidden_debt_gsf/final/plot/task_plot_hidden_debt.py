@@ -1,6 +1,7 @@
 import pandas as pd
 import plotly.express as px
 from hidden_debt_gsf.config import SRC, BLD_data, BLD_figures
+from hidden_debt_gsf.data_management.wide_to_long import wide_to_long
 
 def task_top_country_sector_S13(
         depends_on=BLD_data / "DTA" / "GFSIBS" / "sector_datasets" / "sector_S13.csv",
@@ -40,29 +41,17 @@ def task_top_country_sector_S13(
     # Step 2: Identify year columns (1970 to 2020)
     year_columns = [col for col in filtered_data.columns if col.isdigit() and 1970 <= int(col) <= 2020]
 
-    # Step 3: Reshape data to pivot by vintage
-    pivot_data_new = (
-        filtered_data.melt(
-            id_vars=['Country Name', 'Sector Name', 'Vintage'], 
-            value_vars=year_columns, 
-            var_name='Year', 
-            value_name='Value'
-        )
-    )
-
-    # Ensure 'Value' is numeric
-    pivot_data_new['Value'] = pd.to_numeric(pivot_data_new['Value'], errors='coerce')
+    # Step 3: Reshape the non-missing values to long format by vintage
+    plot_data = wide_to_long(filtered_data, id_vars=['Country Name', 'Sector Name', 'Vintage'], year_columns=year_columns)
 
     # Step 3: Reshape the data for grouped bar plot
-    plot_data = pivot_data_new.dropna(subset=['Value'])  # Remove rows with NaN in 'Value'
-
     plot_data['Year'] = plot_data['Year'].astype(str)
     plot_data['Vintage'] = plot_data['Vintage'].astype(str)
 
     # Sort data for better alignment
     plot_data = plot_data.sort_values(by=['Year', 'Vintage'])
 
-    country_name = pivot_data_new.iloc[0]['Country Name']
+    country_name = filtered_data.iloc[0]['Country Name']
 
     # Step 4: Create the grouped bar chart
     fig = px.bar(
@@ -1,18 +1,23 @@
-import pandas as pd
 from pathlib import Path
 import plotly.express as px
-from hidden_debt_gsf.config import SRC, BLD_data, BLD_figures
+from hidden_debt_gsf.config import SRC, BLD_figures
+from hidden_debt_gsf.data_management.panel_store import read_panel, store_path
+from hidden_debt_gsf.final.plot.country_reports import REPORT_COUNTRIES, country_vintage_specs, load_report_panel
+from hidden_debt_gsf.final.plot.rendering import PLOTLY_JS, figure_spec, render_figures
 
 
 def plot_vintage_diff_histogram(merged_vintage, debt_type="total", cap=100, output_folder= Path("hist")):
     """
-    Create and display a histogram of percentage changes between consecutive vintages using Plotly.
+    Create a histogram of percentage changes between consecutive vintages using Plotly.
 
     Parameters:
         merged_vintage (pd.DataFrame): DataFrame containing vintage differences.
             Must include the column 'Value_Diff_Perc' representing the percent change from the previous vintage.
         debt_type (str): Debt type used for labeling in the title.
         cap (int): Cap for outlier filtering on both sides.
+
+    Returns:
+        dict: Figure spec of the histogram, to be rendered with render_figures.
     """
     # Drop NaNs from the percent change column
     percent_changes = merged_vintage['Value_Diff_Perc'].dropna()
@@ -54,66 +59,26 @@ def plot_vintage_diff_histogram(merged_vintage, debt_type="total", cap=100, outp
         xaxis_range=[-cap, cap]
     )
     output_path = output_folder / f"hist_net_incurrence_diff_{debt_type}.html"
-    fig.write_html(output_path)
-
-def plot_greece_net_incurrence_liabilities(combined_data, debt_type, output_folder=Path("greece")):
-    """
-    Filter the combined data for Greece and create a grouped bar chart for Value by Year and Vintage.
-    The plot is saved as an HTML file in the specified output folder.
-    
-    Parameters:
-        combined_data (pd.DataFrame): DataFrame containing the combined dataset for all debt types.
-        debt_type (str): Debt type (e.g., 'total', 'domestic', or 'foreign') used for labeling.
-        output_folder (str): Directory in which to save the HTML file.
-    """
-    # Ensure the output directory exists.
-    output_folder.mkdir(parents=True, exist_ok=True)
-    
-    # Filter for Greece (Country Code 174)
-    greece_data = combined_data[combined_data['Country Code'] == 174].copy()
-    
-    # Convert Year and Vintage to string for proper categorical display.
-    greece_data['Year'] = greece_data['Year'].astype(str)
-    greece_data['Vintage'] = greece_data['Vintage'].astype(str)
-    
-    # Create a grouped bar chart with Year on the x-axis, Value on the y-axis, grouped by Vintage.
-    fig = px.bar(
-        greece_data,
-        x="Year",
-        y="Value",
-        color="Vintage",
-        barmode="group",
-        title=f"Greece: Net Incurrence of Liabilities by Year and Vintage ({debt_type})"
-    )
-    
-    # Customize the layout.
-    fig.update_layout(
-        xaxis_title="Year",
-        yaxis_title="Value",
-        legend_title="Vintage"
-    )
-    
-    # Build the output file path.
-    output_file = output_folder / f"greece_{debt_type}_net_incurrence_liabilities.html"
-    fig.write_html(str(output_file))
-    fig.write_html(output_file)
-
+    return figure_spec(fig, output_path)
 
 def task_plot_net_incurrence(
-        depends_on=BLD_data / "Merged" / "all_types_net_incurrenence_liabilities.csv"
+        depends_on=store_path("net_incurrence"),
+        plotly_js=PLOTLY_JS
 ):
-    combined_data = pd.read_csv(depends_on)
+    # The histograms only need the percentage changes of the whole panel
+    combined_data = read_panel("net_incurrence", columns=["Value_Diff_Perc"])
     # Define the debt types to process.
     debt_types = ["total", "domestic", "foreign"]
 
-    output_folder_greece=BLD_figures / "Greece" / "Net_Incurrence"
-    output_folder_greece.mkdir(parents=True, exist_ok=True)
     output_folder_hist= BLD_figures / "Merged" / "Net_Incurrence"
     output_folder_hist.mkdir(parents=True, exist_ok=True)
     
+    # Vintage bar charts of every country, from one pass over the panel
+    specs = country_vintage_specs(load_report_panel("net_incurrence", REPORT_COUNTRIES), "net_incurrence", REPORT_COUNTRIES, debt_types)
+
     for dt in debt_types:
-        #  Plot the debt stock for Greece.
-        plot_greece_net_incurrence_liabilities(combined_data=combined_data, debt_type=dt, output_folder=output_folder_greece)
-                
         # Plot the vintage differences histogram.
-        plot_vintage_diff_histogram(merged_vintage=combined_data, debt_type=dt, cap=50, output_folder= output_folder_hist)
+        specs.append(plot_vintage_diff_histogram(merged_vintage=combined_data, debt_type=dt, cap=50, output_folder= output_folder_hist))
+
+    # Write all figures at once, sharing one plotly.js bundle
+    render_figures(specs, plotly_js=plotly_js)
@@ -0,0 +1,14 @@
+from hidden_debt_gsf.final.plot.rendering import PLOTLY_JS, write_plotly_js
+
+
+def task_write_plotly_js(
+        produces=PLOTLY_JS
+):
+    """
+    Writes the plotly.js bundle that all HTML figures reference, so it is written by
+    exactly one task and rebuilt by pytask when it is missing or modified.
+
+    Args:
+        produces (Path): Path to the versioned plotly.js bundle.
+    """
+    write_plotly_js(produces)